@@ -0,0 +1,131 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from .metrics import record_stage
+
+class Overloaded(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청을 받을 수 없음"""
+
+    def __init__(self, retry_after, message="요청이 많아 잠시 후 다시 시도해주세요"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionLimiter:
+    """OpenAI 호출 동시 실행 수 제한 + 길이 제한 대기열
+
+    대기열까지 가득 차면 기다리지 않고 바로 Overloaded를 던져서, 부하가 몰려도
+    대기 시간이 끝없이 늘어나지 않도록 한다. 이벤트 루프 안에서만 사용한다.
+    """
+
+    def __init__(self, max_concurrent, max_queue, timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        # 슬롯 점유 시간 이동 평균 (Retry-After 추정용)
+        self.average_seconds = 1.0
+
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+            self.active = self.waiting = 0
+        return self._semaphore
+
+    def retry_after(self):
+        return max(1, math.ceil(self.average_seconds * (self.waiting + 1) / max(self.max_concurrent, 1)))
+
+    @asynccontextmanager
+    async def slot(self):
+        semaphore = self._get_semaphore()
+        if self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+
+        self.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise Overloaded(self.retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        start = time.monotonic()
+        record_stage("queue", start - queued_at)
+        try:
+            yield
+        finally:
+            self.active -= 1
+            semaphore.release()
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * (time.monotonic() - start)
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "average_seconds": round(self.average_seconds, 3)
+        }
+
+class ClientRateLimiter:
+    """클라이언트별 토큰 버킷 (초당 rate개 충전, 최대 burst개)"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.limited = 0
+
+        # client -> (남은 토큰, 마지막 충전 시각), 오래 안 온 클라이언트부터 제거
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """허용이면 0, 아니면 다시 시도할 때까지 기다릴 초"""
+        if self.rate <= 0:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = max(1, math.ceil((1 - tokens) / self.rate))
+                self.limited += 1
+
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "limited": self.limited
+        }
@@ -0,0 +1,149 @@
+import math
+import faiss
+import numpy as np
+from ..common.config import Config
+
+# flat: 전수 비교(정확) / hnsw: 그래프 탐색 / ivfpq: 클러스터 + 곱 양자화(압축 벡터)
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+def index_vectors(index):
+    """인덱스에 저장된 벡터를 FAISS 위치 순서대로 꺼냄 (flat/hnsw는 원본, ivfpq는 근사값)"""
+    return index.reconstruct_n(0, index.ntotal)
+
+def default_nlist(count):
+    # 클러스터 수는 sqrt(N)의 4배 정도, 학습용으로 클러스터당 39개 이상이 되도록 제한
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+def build_index(vectors, index_type="flat", metric=faiss.METRIC_L2, hnsw_m=32, ef_construction=200,
+                nlist=0, pq_m=96, nbits=8, refine=0):
+    """FAISS 위치 순서를 유지한 채 벡터로 인덱스 생성
+
+    ivfpq에서 refine > 0이면 PQ 후보 k * refine개를 원본 벡터로 다시 정렬 (recall과 점수가 정확해지는
+    대신 원본 벡터만큼 메모리를 더 씀)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dimension = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimension) if metric == faiss.METRIC_L2 else faiss.IndexFlatIP(dimension)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+    elif index_type == "ivfpq":
+        if dimension % pq_m:
+            raise ValueError(f"PQ 서브벡터 수({pq_m})가 벡터 차원({dimension})의 약수가 아닙니다")
+        if count < 2 ** nbits:
+            raise ValueError(f"IVF-PQ 학습에 문서가 {2 ** nbits}개 이상 필요합니다 (현재 {count}개, flat 사용 권장)")
+        nlist = nlist or default_nlist(count)
+        quantizer = faiss.IndexFlatL2(dimension) if metric == faiss.METRIC_L2 else faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, nbits, metric)
+        index.train(vectors)
+        if refine:
+            index = faiss.IndexRefineFlat(index)
+            index.k_factor = refine
+    else:
+        raise ValueError(f"지원하지 않는 인덱스 종류입니다: {index_type} ({', '.join(INDEX_TYPES)})")
+
+    index.add(vectors)
+    if index_type == "ivfpq":
+        # 리로드 검증/관련 용어 그래프가 위치로 벡터를 꺼낼 수 있도록 direct map 유지
+        _ivf(index).make_direct_map()
+    return index
+
+def convert_index(index, index_type=None):
+    """빌드된 flat 인덱스를 설정(VECTORSTORE_INDEX_TYPE, HNSW_*, IVF_*, PQ_*)의 인덱스로 변환"""
+    index_type = index_type or Config.VECTORSTORE_INDEX_TYPE
+    if index_type == "flat":
+        return index
+    if index_type == "ivfpq" and not Config.PQ_REFINE:
+        print("경고: PQ_REFINE=0 이면 IVF-PQ 근사 거리로 점수 하한/차이 컷을 적용하게 되어 검색 품질이 크게 떨어집니다")
+    return build_index(
+        index_vectors(index),
+        index_type,
+        metric=index.metric_type,
+        hnsw_m=Config.HNSW_M,
+        ef_construction=Config.HNSW_EF_CONSTRUCTION,
+        nlist=Config.IVF_NLIST,
+        pq_m=Config.PQ_M,
+        nbits=Config.PQ_NBITS,
+        refine=Config.PQ_REFINE
+    )
+
+def _ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+def get_index_type(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    ivf = _ivf(index)
+    if ivf is not None:
+        return "ivfpq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf"
+    return "flat"
+
+def tune_index(index, ef_search=None, nprobe=None):
+    """검색 시점 파라미터 적용 (HNSW efSearch / IVF nprobe, 클수록 recall이 오르고 느려짐)"""
+    ef_search = ef_search or Config.HNSW_EF_SEARCH
+    nprobe = nprobe or Config.IVF_NPROBE
+
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    return index
+
+def describe_index(index):
+    """/stats 용 인덱스 종류와 검색 파라미터"""
+    info = {"type": get_index_type(index), "ntotal": int(index.ntotal), "dimension": int(index.d)}
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        info["ef_search"] = int(base.hnsw.efSearch)
+    ivf = _ivf(index)
+    if ivf is not None:
+        info["nlist"] = int(ivf.nlist)
+        info["nprobe"] = int(ivf.nprobe)
+    if isinstance(base, faiss.IndexRefine):
+        info["refine"] = int(base.k_factor)
+    return info
+
+def exact_storage(index):
+    """원본 벡터를 가진 flat 인덱스 (flat 자신, HNSW 저장소, IVF-PQ 재정렬용 벡터), 없으면 None"""
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexFlat):
+        return base
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.downcast_index(base.storage)
+    if isinstance(base, faiss.IndexRefine):
+        return faiss.downcast_index(base.refine_index)
+    return None
+
+def search_parameters(index, selector):
+    """ID 필터 검색 파라미터 (파라미터를 넘기면 인덱스의 efSearch/nprobe 대신 쓰이므로 현재 값을 복사)"""
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexRefine):
+        return faiss.IndexRefineSearchParameters(
+            k_factor=base.k_factor,
+            base_index_params=search_parameters(base.base_index, selector)
+        )
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    ivf = _ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+def filtered_search(index, vectors, k, selector, count):
+    """selector에 속한 위치(count개)만 검색해서 (거리, 위치) 반환
+
+    HNSW/IVF는 필터가 좁으면 탐색 범위 안에 해당 문서가 적어 결과를 놓치므로, 작은 파티션은
+    원본 벡터에서 해당 위치만 전수 비교하고 큰 파티션은 근사 인덱스에 ID 필터를 넘긴다.
+    """
+    storage = exact_storage(index)
+    if storage is not None and count <= Config.PARTITION_EXACT_LIMIT:
+        return storage.search(vectors, k, params=faiss.SearchParameters(sel=selector))
+    return index.search(vectors, k, params=search_parameters(index, selector))
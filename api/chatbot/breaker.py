@@ -0,0 +1,112 @@
+import threading
+import time
+
+class CircuitOpen(Exception):
+    """회로가 열려 있어 호출하지 않음"""
+
+class CircuitBreaker:
+    """외부 API 연속 실패 시 일정 시간 호출을 막는 회로 차단기
+
+    closed: 정상 호출 / open: reset_timeout 동안 호출하지 않음 /
+    half_open: 시험 호출 1건만 허용, 성공하면 closed, 실패하면 다시 open
+    ignore에 있는 예외(요청 제한 429 등 일시적인 거절)는 실패로 세지 않는다.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, ignore=()):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ignore = ignore
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.short_circuited = 0
+
+        self._trial = False
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial = False
+            # 시험 호출 결과가 reset_timeout 동안 기록되지 않으면 (중단된 호출 등) 새 시험 호출 허용
+            if self.state == "half_open" and self._trial and now - self._trial_at >= self.reset_timeout:
+                self._trial = False
+
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                self._trial_at = now
+                return True
+
+            self.short_circuited += 1
+            return False
+
+    def call(self, fn, *args):
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} 회로가 열려 있습니다")
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, fn, *args):
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} 회로가 열려 있습니다")
+        try:
+            result = await fn(*args)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            # 취소된 호출은 성공/실패 어느 쪽으로도 세지 않음
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def release(self):
+        """결과 없이 끝난 호출 (취소 등): 시험 호출 자리만 돌려준다"""
+        with self._lock:
+            if self.state == "half_open":
+                self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self, error=None):
+        if error is not None and isinstance(error, self.ignore):
+            self.release()
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"{self.name} 회로 차단 ({self.reset_timeout}s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited
+        }
@@ -0,0 +1,127 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+def normalize_text(text):
+    """캐시 키용 텍스트 정규화 (유니코드 NFKC, 공백 정리, 소문자)"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).lower()
+
+class SemanticAnswerCache:
+    """질문 임베딩의 코사인 유사도로 이전 답변을 재사용하는 LRU/TTL 캐시"""
+
+    def __init__(self, max_size=1000, ttl=86400, threshold=0.95):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # key -> (slot, result, created_at), 순서가 곧 LRU 순서
+        self._entries = OrderedDict()
+        self._slot_keys = [None] * self.max_size
+        self._free_slots = list(range(self.max_size - 1, -1, -1))
+        self._matrix = None
+        self._valid = np.zeros(self.max_size, dtype=bool)
+
+    def ensure_version(self, version):
+        """벡터스토어가 바뀌었으면 이전 인덱스 기준 답변을 모두 버린다"""
+        with self._lock:
+            if self.version != version:
+                self._reset()
+                self.version = version
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def _remove(self, key):
+        slot, _, _ = self._entries.pop(key)
+        if slot is not None:
+            self._slot_keys[slot] = None
+            self._valid[slot] = False
+            self._free_slots.append(slot)
+
+    def _is_expired(self, created_at):
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def _hit(self, key, result):
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return {**result, "related_terms": list(result["related_terms"]), "cached": True}
+
+    def lookup(self, question, vector=None):
+        """동일 질문 또는 임베딩이 threshold 이상 유사한 질문의 답변을 반환"""
+        if self.max_size <= 0:
+            return None
+        key = normalize_text(question)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._is_expired(entry[2]):
+                    return self._hit(key, entry[1])
+                self._remove(key)
+
+            if vector is not None and self._matrix is not None and self._valid.any():
+                query = np.asarray(vector, dtype=np.float32)
+                query = query / (np.linalg.norm(query) or 1.0)
+
+                scores = self._matrix @ query
+                scores[~self._valid] = -1.0
+                slot = int(np.argmax(scores))
+
+                if scores[slot] >= self.threshold:
+                    matched_key = self._slot_keys[slot]
+                    _, result, created_at = self._entries[matched_key]
+                    if not self._is_expired(created_at):
+                        return self._hit(matched_key, result)
+                    self._remove(matched_key)
+
+            # 동일 질문 조회만 하는 경우(vector 없음)는 아직 미스로 확정하지 않음
+            if vector is not None:
+                self.misses += 1
+            return None
+
+    def put(self, question, vector, result):
+        """vector가 없으면(임베딩을 생략한 경우) 동일 질문 조회에만 사용"""
+        # ANSWER_CACHE_SIZE=0 이면 캐시 비활성화
+        if self.max_size <= 0:
+            return
+        key = normalize_text(question)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            elif len(self._entries) >= self.max_size:
+                self._remove(next(iter(self._entries)))
+
+            slot = None
+            if vector is not None:
+                vector = np.asarray(vector, dtype=np.float32)
+                if self._matrix is None:
+                    self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+                slot = self._free_slots.pop()
+                self._matrix[slot] = vector / (np.linalg.norm(vector) or 1.0)
+                self._valid[slot] = True
+                self._slot_keys[slot] = key
+
+            self._entries[key] = (slot, result, time.time())
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
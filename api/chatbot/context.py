@@ -0,0 +1,116 @@
+from .lexical import char_ngrams
+
+class TokenCounter:
+    """tiktoken 토큰 수 계산 (인코딩 파일을 받을 수 없는 환경에서는 UTF-8 바이트 기반 근사치)"""
+
+    def __init__(self, model):
+        self.encoding = None
+        try:
+            import tiktoken
+            self.encoding = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            print(f"tiktoken 인코딩 로드 실패, 근사치로 토큰 수를 계산합니다: {e}")
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        # 한글은 글자당 약 1토큰(3바이트), 영문은 4글자당 약 1토큰이라 바이트/3이면 넉넉하게 잡힌다
+        return (len(text.encode("utf-8")) + 2) // 3
+
+    def truncate(self, text, max_tokens):
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            # 잘린 멀티바이트 문자는 버린다
+            return self.encoding.decode_bytes(tokens[:max_tokens]).decode("utf-8", errors="ignore")
+
+        while text and self.count(text) > max_tokens:
+            text = text[:max(len(text) * max_tokens // self.count(text), len(text) - 1)]
+        return text
+
+class ContextBuilder:
+    """검색 문서를 토큰 예산 안에서 프롬프트 context로 조립
+
+    점수 순으로 정렬하고, 앞 문서와 내용이 대부분 겹치는 문서는 제외한 뒤
+    예산을 넘는 문서는 남은 예산만큼 자르거나 버린다. 여러 문서가 예산을 나눠 써야 할 때만
+    긴 IPO 문단 하나가 예산을 다 쓰지 않도록 뒤 문서 몫을 남기고 문서 하나는 예산의 절반까지만 넣는다.
+    """
+
+    def __init__(self, counter, budget, min_chunk_tokens=64, overlap_threshold=0.8, separator="\n\n"):
+        self.counter = counter
+        self.budget = budget
+        self.min_chunk_tokens = min_chunk_tokens
+        self.overlap_threshold = overlap_threshold
+        self.separator = separator
+        self.separator_tokens = counter.count(separator)
+        self.max_chunk_tokens = max(budget // 2, min_chunk_tokens)
+
+    def _overlaps(self, grams, selected):
+        # 짧은 쪽 기준 3-gram 포함 비율이 임계값 이상이면 중복으로 판단
+        for other in selected:
+            common = len(grams & other)
+            if common and common / min(len(grams), len(other)) >= self.overlap_threshold:
+                return True
+        return False
+
+    def build(self, texts, scores=None):
+        """(context, 사용한 원본 인덱스 목록, 리포트) 반환, scores는 클수록 관련도가 높음"""
+        order = list(range(len(texts)))
+        if scores is not None:
+            order.sort(key=lambda i: scores[i], reverse=True)
+
+        original_tokens = 0
+        candidates, seen = [], []
+        duplicates = truncated = 0
+
+        # 중복을 먼저 걸러서 예산을 나눠 쓸 문서가 몇 개인지 확인
+        for i in order:
+            text = texts[i].strip()
+            tokens = self.counter.count(text)
+            original_tokens += tokens + (self.separator_tokens if original_tokens else 0)
+
+            grams = set(char_ngrams(text, sizes=(3,)))
+            if not text or self._overlaps(grams, seen):
+                duplicates += 1
+                continue
+            candidates.append((i, text, tokens))
+            seen.append(grams)
+
+        # 뒤 문서들이 (문서당 상한까지) 필요로 하는 토큰 수
+        reserved = [0] * (len(candidates) + 1)
+        for position in range(len(candidates) - 1, -1, -1):
+            tokens = candidates[position][2]
+            reserved[position] = reserved[position + 1] + min(tokens, self.max_chunk_tokens) + self.separator_tokens
+
+        parts, used = [], []
+        used_tokens = 0
+        for position, (i, text, tokens) in enumerate(candidates):
+            separator_tokens = self.separator_tokens if parts else 0
+            room = self.budget - used_tokens - separator_tokens
+            # 뒤 문서 몫을 남기되 상한(예산의 절반)보다 적게 주지는 않음, 뒤 문서가 없으면 남은 예산 전부
+            room = min(room, max(room - reserved[position + 1], self.max_chunk_tokens))
+            if tokens > room:
+                if room < self.min_chunk_tokens:
+                    continue
+                text = self.counter.truncate(text, room)
+                tokens = self.counter.count(text)
+                truncated += 1
+
+            parts.append(text)
+            used.append(i)
+            used_tokens += tokens + separator_tokens
+
+        report = {
+            "budget": self.budget,
+            "context_tokens": used_tokens,
+            "original_tokens": original_tokens,
+            "tokens_saved": original_tokens - used_tokens,
+            "chunks_used": len(used),
+            "chunks_dropped": len(texts) - len(used),
+            "duplicates": duplicates,
+            "truncated": truncated
+        }
+        return self.separator.join(parts), used, report
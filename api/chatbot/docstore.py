@@ -0,0 +1,193 @@
+import json
+import mmap
+import os
+import sys
+from collections.abc import Mapping
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_HEADER = "docstore.json"
+DOCSTORE_DATA = "docstore.bin"
+DOCSTORE_OFFSETS = "docstore.idx"
+
+def _write_blob(prefix, values):
+    """UTF-8 blob(.bin) + int64 시작 위치(.idx, 개수 + 1) 기록"""
+    offsets = [0]
+    with open(prefix + ".bin.tmp", "wb") as f:
+        for value in values:
+            f.write(value.encode("utf-8"))
+            offsets.append(f.tell())
+    np.asarray(offsets, dtype=np.int64).tofile(prefix + ".idx.tmp")
+    return [prefix + ".bin", prefix + ".idx"]
+
+def write_docstore(path, documents):
+    """FAISS 위치 순서의 문서들을 압축 문서 저장소로 기록
+
+    docstore.bin / .idx          : page_content UTF-8 blob + 시작 위치
+    docstore.col<N>.codes        : 메타데이터 컬럼별 사전 코드(int32, 없으면 -1)
+    docstore.col<N>.dict.bin/.idx: 사전 값(JSON) blob + 시작 위치
+    docstore.json                : 문서 수와 컬럼 목록 (마지막에 기록)
+    """
+    documents = list(documents)
+    files = _write_blob(os.path.join(path, "docstore"), (doc.page_content for doc in documents))
+
+    names = []
+    for doc in documents:
+        for name in doc.metadata:
+            if name not in names:
+                names.append(name)
+
+    columns = {}
+    for i, name in enumerate(names):
+        prefix = os.path.join(path, f"docstore.col{i}")
+        dictionary = {}
+        codes = np.full(len(documents), -1, dtype=np.int32)
+        for position, doc in enumerate(documents):
+            if name in doc.metadata:
+                value = json.dumps(doc.metadata[name], ensure_ascii=False)
+                codes[position] = dictionary.setdefault(value, len(dictionary))
+
+        codes.tofile(prefix + ".codes.tmp")
+        files.append(prefix + ".codes")
+        files.extend(_write_blob(prefix + ".dict", dictionary))
+        columns[name] = f"docstore.col{i}"
+
+    with open(os.path.join(path, DOCSTORE_HEADER) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": 2, "count": len(documents), "columns": columns}, f, ensure_ascii=False)
+    files.append(os.path.join(path, DOCSTORE_HEADER))
+
+    # 실행 중인 워커가 반쯤 쓰인 파일을 보지 않도록 교체는 rename으로 (헤더가 마지막)
+    for name in files:
+        os.replace(name + ".tmp", name)
+
+class Blob:
+    """offsets + UTF-8 blob 파일을 mmap으로 읽는 문자열 배열"""
+
+    def __init__(self, prefix):
+        self.offsets = np.fromfile(prefix + ".idx", dtype=np.int64)
+        with open(prefix + ".bin", "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return self.data[self.offsets[position]:self.offsets[position + 1]].decode("utf-8")
+
+class MetadataColumn:
+    """사전 인코딩된 메타데이터 컬럼"""
+
+    def __init__(self, prefix):
+        self.codes = np.memmap(prefix + ".codes", dtype=np.int32, mode="r")
+        self.dictionary = Blob(prefix + ".dict")
+        self._values = {}
+
+    def get(self, position):
+        code = int(self.codes[position])
+        if code < 0:
+            return None
+        # 같은 값이 반복되는 컬럼(source 등)은 디코딩 결과를 재사용
+        if code not in self._values:
+            self._values[code] = json.loads(self.dictionary[code])
+        return self._values[code]
+
+class PositionIds(Mapping):
+    """FAISS 위치 -> 문서 ID 매핑, 압축 문서 저장소는 위치 자체를 ID로 사용"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, position):
+        if 0 <= position < self.size:
+            return int(position)
+        raise KeyError(position)
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+class MmapDocstore(Docstore):
+    """읽기 전용 mmap 압축 문서 저장소
+
+    파일은 OS 페이지 캐시를 통해 모든 워커가 공유하고, 문서 객체는 검색 결과로
+    요청된 것만 만든다. 메타데이터는 컬럼 단위라 본문을 읽지 않고도 조회할 수 있다.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, DOCSTORE_HEADER), encoding="utf-8") as f:
+            header = json.load(f)
+
+        self.contents = Blob(os.path.join(path, "docstore"))
+        self.columns = {
+            name: MetadataColumn(os.path.join(path, prefix))
+            for name, prefix in header["columns"].items()
+        }
+
+    def __len__(self):
+        return len(self.contents)
+
+    def column(self, name, position):
+        column = self.columns.get(name)
+        return column.get(position) if column else None
+
+    def metadata(self, position):
+        metadata = {}
+        for name, column in self.columns.items():
+            value = column.get(position)
+            if value is not None:
+                metadata[name] = value
+        return metadata
+
+    def search(self, search):
+        position = int(search)
+        if not 0 <= position < len(self):
+            return f"ID {search} not found."
+        return Document(page_content=self.contents[position], metadata=self.metadata(position))
+
+def has_docstore(path):
+    return os.path.exists(os.path.join(path, DOCSTORE_HEADER))
+
+def load_compact_vectorstore(path, embeddings, use_mmap=False):
+    """index.faiss + 압축 문서 저장소로 벡터스토어 구성 (index.pkl 역직렬화 없음)
+
+    use_mmap이면 인덱스도 읽기 전용 mmap으로 열어서 워커를 늘려도 추가 메모리가 거의 들지 않는다.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_path = os.path.join(path, "index.faiss")
+    index = None
+    if use_mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError:
+            # IVF-PQ 역색인 등 mmap을 지원하지 않는 인덱스는 메모리로 로드 (PQ 코드라 크기가 작음)
+            print("mmap을 지원하지 않는 인덱스라 메모리로 로드합니다")
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    docstore = MmapDocstore(path)
+    if len(docstore) != index.ntotal:
+        raise ValueError(f"문서 저장소({len(docstore)})와 인덱스({index.ntotal})의 문서 수가 다릅니다")
+
+    return FAISS(embeddings, index, docstore, PositionIds(len(docstore)))
+
+def export_docstore(path):
+    """기존 index.pkl(InMemoryDocstore)을 압축 문서 저장소로 변환 (빌드 환경에서 1회)"""
+    import pickle
+
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    documents = [docstore.search(index_to_docstore_id[i]) for i in range(len(index_to_docstore_id))]
+    write_docstore(path, documents)
+    return len(documents)
+
+if __name__ == "__main__":
+    # python -m api.chatbot.docstore economic_terms_faiss
+    target = sys.argv[1] if len(sys.argv) > 1 else "economic_terms_faiss"
+    print(f"{export_docstore(target)}개 문서를 {target}/{DOCSTORE_DATA} 로 변환했습니다")
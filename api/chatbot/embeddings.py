@@ -0,0 +1,254 @@
+import asyncio
+import fcntl
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from ..common.usage import usage_tracker
+from .cache import normalize_text
+from .context import TokenCounter
+from .metrics import record_tokens
+
+class EmbeddingDiskCache:
+    """float32 벡터 행렬(memmap) + 키 인덱스(jsonl)로 구성된 디스크 임베딩 캐시
+
+    <model>.f32  : 벡터를 행 단위로 이어붙인 float32 바이너리
+    <model>.keys : 첫 줄은 {"model", "dim"} 헤더, 이후 ["정규화된 텍스트", 행 번호] JSON 라인
+    여러 워커가 같은 디렉터리를 쓸 수 있도록 추가 기록은 flock으로 직렬화한다.
+    기록 도중 중단되어 남은 불완전한 행/줄은 다음 기록 전에 잘라내거나 줄을 바꿔서 이후 행 번호가 밀리지 않게 한다.
+    """
+
+    def __init__(self, cache_dir, model, max_rows=200000):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.model = model
+        self.vectors_path = os.path.join(cache_dir, f"{model}.f32")
+        self.keys_path = os.path.join(cache_dir, f"{model}.keys")
+        self.max_rows = max_rows
+
+        self.rows = {}
+        self.dim = None
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.keys_path):
+            return
+
+        with open(self.keys_path, encoding="utf-8") as f:
+            header = f.readline()
+            if not header:
+                return
+            self.dim = json.loads(header)["dim"]
+
+            for line in f:
+                try:
+                    key, row = json.loads(line)
+                except ValueError:
+                    continue  # 기록 도중 중단된 줄
+                self.rows[key] = row
+
+        # 벡터 파일에 온전히 기록된 행을 가리키는 키만 사용
+        count = self._row_count()
+        valid = {key: row for key, row in self.rows.items() if isinstance(row, int) and 0 <= row < count}
+        if len(valid) != len(self.rows):
+            print(f"임베딩 캐시 키 {len(self.rows) - len(valid)}개가 벡터 파일과 맞지 않아 무시합니다")
+        self.rows = valid
+
+        if self.rows:
+            self._map()
+
+    def _row_count(self):
+        try:
+            return os.path.getsize(self.vectors_path) // 4 // self.dim
+        except OSError:
+            return 0
+
+    def _map(self):
+        n = self._row_count()
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def get(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            self._map()
+        return self._matrix[row].tolist()
+
+    def put(self, key, vector):
+        if len(self.rows) >= self.max_rows:
+            return
+
+        data = np.asarray(vector, dtype=np.float32)
+        if self.dim is None:
+            self.dim = data.shape[0]
+
+        row_bytes = 4 * self.dim
+        with open(self.keys_path, "a+b") as keys_file:
+            fcntl.flock(keys_file, fcntl.LOCK_EX)
+            try:
+                lines = []
+                size = keys_file.seek(0, os.SEEK_END)
+                if size == 0:
+                    lines.append(json.dumps({"model": self.model, "dim": self.dim}) + "\n")
+                else:
+                    keys_file.seek(size - 1)
+                    if keys_file.read(1) != b"\n":
+                        lines.append("\n")  # 중단된 줄 뒤에 이어 쓰지 않도록 줄바꿈
+
+                with open(self.vectors_path, "ab") as vectors_file:
+                    # 중단된 기록이 남긴 불완전한 마지막 행은 잘라내고 행 경계에서 추가
+                    size = vectors_file.seek(0, os.SEEK_END)
+                    if size % row_bytes:
+                        vectors_file.truncate(size - size % row_bytes)
+                    row = size // row_bytes
+                    vectors_file.write(data.tobytes())
+                lines.append(json.dumps([key, row], ensure_ascii=False) + "\n")
+                keys_file.write("".join(lines).encode("utf-8"))
+                keys_file.flush()
+            finally:
+                fcntl.flock(keys_file, fcntl.LOCK_UN)
+
+        self.rows[key] = row
+
+class CachedEmbeddings(Embeddings):
+    """질문 임베딩을 메모리 LRU와 디스크에 캐시하는 Embeddings 래퍼
+
+    문서 임베딩(벡터스토어 생성)은 캐시하지 않고 그대로 위임한다.
+    """
+
+    def __init__(self, embeddings, model, cache_dir=None, max_memory=10000, breaker=None):
+        self.embeddings = embeddings
+        self.model = model
+        # 캐시 미스로 API를 호출할 때만 회로 차단기를 거친다 (캐시된 질문은 장애 중에도 동작)
+        self.breaker = breaker
+        self.max_memory = max_memory
+        self.disk = EmbeddingDiskCache(cache_dir, model) if cache_dir else None
+        # 임베딩 API는 사용량을 돌려주지 않으므로 보낸 텍스트의 토큰 수를 직접 계산
+        self.counter = TokenCounter(model)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # 디스크 기록은 메모리 캐시 잠금과 분리해서 느린 파일 I/O 동안 캐시 조회를 막지 않는다
+        self._disk_lock = threading.Lock()
+
+    def _key(self, text):
+        return (self.model, normalize_text(text))
+
+    def _get(self, key):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            if self.disk is not None:
+                vector = self.disk.get(key[1])
+                if vector is not None:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        if len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _put(self, items):
+        # items: (키, 벡터) 목록, 메모리에 넣고 디스크에 기록 (flock + 파일 추가라 이벤트 루프에서는 _aput 사용)
+        self._remember_all(items)
+        self._persist(items)
+
+    async def _aput(self, items):
+        self._remember_all(items)
+        if self.disk is not None:
+            await asyncio.to_thread(self._persist, items)
+
+    def _remember_all(self, items):
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+
+    def _persist(self, items):
+        if self.disk is None:
+            return
+        with self._disk_lock:
+            for key, vector in items:
+                try:
+                    self.disk.put(key[1], vector)
+                except OSError as e:
+                    print(f"임베딩 캐시 저장 실패: {e}")
+                    return
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        return await self.embeddings.aembed_documents(texts)
+
+    def _call(self, fn, *args):
+        return self.breaker.call(fn, *args) if self.breaker else fn(*args)
+
+    async def _acall(self, fn, *args):
+        return await (self.breaker.acall(fn, *args) if self.breaker else fn(*args))
+
+    def _record_usage(self, texts):
+        tokens = sum(self.counter.count(text) for text in texts)
+        usage_tracker.record(self.model, tokens)
+        record_tokens(embedding=tokens)
+
+    def embed_query(self, text):
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self._call(self.embeddings.embed_query, text)
+            self._record_usage([text])
+            self._put([(key, vector)])
+        return vector
+
+    async def aembed_query(self, text):
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = await self._acall(self.embeddings.aembed_query, text)
+            self._record_usage([text])
+            await self._aput([(key, vector)])
+        return vector
+
+    def _split_cached(self, texts):
+        # 캐시에 있는 벡터는 채우고, 없는 텍스트만 (위치, 텍스트)로 모아 한 번에 임베딩
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        missing = [(i, text) for i, (text, vector) in enumerate(zip(texts, vectors)) if vector is None]
+        return keys, vectors, missing
+
+    async def aembed_queries(self, texts):
+        """여러 질문을 캐시 확인 후 미스만 1회 API 호출로 임베딩"""
+        keys, vectors, missing = self._split_cached(texts)
+        if missing:
+            embedded = await self._acall(self.embeddings.aembed_documents, [text for _, text in missing])
+            self._record_usage([text for _, text in missing])
+            for (i, _), vector in zip(missing, embedded):
+                vectors[i] = vector
+            await self._aput([(keys[i], vector) for (i, _), vector in zip(missing, embedded)])
+        return vectors
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "memory_size": len(self._memory),
+            "disk_size": len(self.disk.rows) if self.disk is not None else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses
+        }
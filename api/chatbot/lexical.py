@@ -0,0 +1,95 @@
+import unicodedata
+from collections import Counter
+import numpy as np
+
+def char_ngrams(text, sizes=(2, 3)):
+    """공백 단위 어절 안에서 문자 2/3-gram 추출 (한국어 형태소 분석 없이 조사/어미 변화에 강함)"""
+    grams = []
+    for token in unicodedata.normalize("NFKC", text).lower().split():
+        if len(token) < min(sizes):
+            grams.append(token)
+            continue
+        for n in sizes:
+            for i in range(len(token) - n + 1):
+                grams.append(token[i:i + n])
+    return grams
+
+class LexicalIndex:
+    """문자 n-gram BM25 역색인
+
+    postings는 n-gram 순으로 정렬된 CSR 배열(offsets, doc_ids, tfs)에 보관해서
+    문서 수가 늘어도 파이썬 객체 수가 늘지 않도록 한다.
+    """
+
+    def __init__(self, texts, titles=None, title_weight=2.0, k1=1.2, b=0.75):
+        self.k1 = k1
+        # 용어명(제목)만으로 만든 보조 색인, 본문이 긴 문서가 용어 자체보다 앞서는 것을 막는다
+        self.title_index = LexicalIndex(titles, k1=k1, b=b) if titles else None
+        self.title_weight = title_weight
+        self.vocab = {}
+
+        gram_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            if not text:
+                continue
+            counts = Counter(char_ngrams(text))
+            doc_len[doc_id] = sum(counts.values())
+            for gram, tf in counts.items():
+                gram_ids.append(self.vocab.setdefault(gram, len(self.vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        gram_ids = np.asarray(gram_ids, dtype=np.int32)
+        order = np.argsort(gram_ids, kind="stable")
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)[order]
+        self.tfs = np.asarray(tfs, dtype=np.float32)[order]
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(self.vocab)), out=self.offsets[1:])
+
+        n_docs = max(int(np.count_nonzero(doc_len)), 1)
+        df = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        avg_len = float(doc_len.sum()) / n_docs or 1.0
+        self.length_norm = k1 * (1 - b + b * doc_len / avg_len)
+        self.size = len(texts)
+
+    def _scores(self, grams):
+        scores = np.zeros(self.size, dtype=np.float32)
+
+        for gram in grams:
+            gram_id = self.vocab.get(gram)
+            if gram_id is None:
+                continue
+            start, end = self.offsets[gram_id], self.offsets[gram_id + 1]
+            ids = self.doc_ids[start:end]
+            tf = self.tfs[start:end]
+            scores[ids] += self.idf[gram_id] * tf * (self.k1 + 1) / (tf + self.length_norm[ids])
+
+        return scores
+
+    def search(self, query, k=5, mask=None):
+        """BM25 점수 상위 k개 (문서 위치, 점수) 반환, mask가 있으면 True인 위치만"""
+        grams = set(char_ngrams(query))
+        scores = self._scores(grams)
+        if self.title_index is not None:
+            scores += self.title_weight * self.title_index._scores(grams)
+        if mask is not None:
+            scores[~mask] = 0
+
+        k = min(k, self.size)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+def reciprocal_rank_fusion(rankings, k, c=60):
+    """여러 검색 결과(문서 키 리스트)를 RRF로 합쳐 상위 k개 키 반환"""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (c + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
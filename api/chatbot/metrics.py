@@ -0,0 +1,186 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from ..common.config import Config
+from ..common.usage import estimate_cost
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_BUCKETS = (32, 64, 128, 256, 512, 1024, 2048, 4096)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 10)
+
+class Histogram:
+    """Prometheus 형식 누적 히스토그램 (라벨 값 조합별로 버킷 카운트 유지)"""
+
+    def __init__(self, name, description, buckets, labels=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        # 라벨 값 튜플 -> [버킷별 카운트..., +Inf 카운트, 합계]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def _label_text(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, values in series:
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{self._label_text(key, ('le', f'{bound:g}'))} {count}")
+            lines.append(f"{self.name}_bucket{self._label_text(key, ('le', '+Inf'))} {values[-2]}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {values[-2]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, name, description, buckets, labels=()):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, description, buckets, labels)
+        return self.histograms[name]
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+request_seconds = registry.histogram(
+    "chatbot_request_seconds", "챗봇 답변 전체 소요 시간 (응답 경로별)", LATENCY_BUCKETS, ("kind", "path")
+)
+stage_seconds = registry.histogram(
+    "chatbot_stage_seconds", "챗봇 답변 단계별 소요 시간", LATENCY_BUCKETS, ("stage",)
+)
+token_count = registry.histogram(
+    "chatbot_tokens", "요청당 토큰 수 (context, embedding, prompt, completion)", TOKEN_BUCKETS, ("kind",)
+)
+retrieval_score = registry.histogram(
+    "chatbot_retrieval_top_score", "검색 1위 문서 유사도", SCORE_BUCKETS
+)
+retrieved_docs = registry.histogram(
+    "chatbot_retrieved_docs", "점수 기준 선택 후 LLM에 넘긴 검색 문서 수", COUNT_BUCKETS
+)
+
+# 요청을 처리하는 스레드/태스크에서 현재 추적 중인 요청 (asyncio 태스크와 to_thread에 그대로 전달됨)
+current_trace = contextvars.ContextVar("chatbot_trace", default=None)
+
+class RequestTrace:
+    """요청 하나의 단계별 소요 시간, 토큰 수, 검색 점수 기록"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.tokens = {}
+        self.scores = []
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def cost(self):
+        return (
+            estimate_cost(Config.CHAT_MODEL, self.tokens.get("prompt", 0), self.tokens.get("completion", 0))
+            + estimate_cost(Config.EMBEDDING_MODEL, self.tokens.get("embedding", 0))
+        )
+
+    @staticmethod
+    def _path(result):
+        if result is None:
+            return "rejected"
+        if not result.get("success"):
+            return "error"
+        if result.get("cached"):
+            return "cache"
+        if result.get("fallback"):
+            return "fallback"
+        if "context" in result:
+            return "llm"
+        return "term" if result.get("source_count") else "no_match"
+
+    def finish(self, result=None, path=None):
+        """히스토그램에 반영하고 느린 요청이면 단계별 내역을 로그로 남긴다"""
+        total = time.perf_counter() - self.start
+        path = path or self._path(result)
+
+        request_seconds.observe(total, kind=self.kind, path=path)
+        for stage, seconds in self.stages.items():
+            stage_seconds.observe(seconds, stage=stage)
+        for kind, count in self.tokens.items():
+            token_count.observe(count, kind=kind)
+        if self.scores:
+            retrieval_score.observe(self.scores[0])
+        if path == "llm":
+            retrieved_docs.observe(len(self.scores))
+
+        report = {
+            "path": path,
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+            "tokens": dict(self.tokens),
+            "cost_usd": round(self.cost(), 6),
+            "scores": [round(score, 4) for score in self.scores]
+        }
+        if Config.SLOW_REQUEST_MS > 0 and total * 1000 >= Config.SLOW_REQUEST_MS:
+            breakdown = " ".join(f"{stage}={ms}ms" for stage, ms in report["stages_ms"].items())
+            print(f"느린 챗봇 요청 ({self.kind}, {path}) {report['total_ms']}ms: {breakdown} tokens={report['tokens']}")
+        return report
+
+@contextmanager
+def timed(stage):
+    """현재 요청의 단계 소요 시간 기록 (추적 중인 요청이 없으면 아무것도 하지 않음)"""
+    trace = current_trace.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add_stage(stage, time.perf_counter() - start)
+
+def record_stage(stage, seconds):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+def mark(stage):
+    """요청 시작부터 지금까지의 시간을 기록 (첫 토큰까지 걸린 시간 등)"""
+    trace = current_trace.get()
+    if trace is not None and stage not in trace.stages:
+        trace.add_stage(stage, time.perf_counter() - trace.start)
+
+def record_tokens(**counts):
+    trace = current_trace.get()
+    if trace is not None:
+        for kind, count in counts.items():
+            if count is not None:
+                trace.tokens[kind] = trace.tokens.get(kind, 0) + count
+
+def record_scores(scores):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.scores = [score for score in scores if score is not None]
@@ -1,81 +1,763 @@
+import asyncio
 import os
-from langchain.chains import RetrievalQA
+import threading
+import numpy as np
+import openai
+from langchain.chains.question_answering.stuff_prompt import PROMPT_SELECTOR
+from langchain_core.documents import Document
+from langchain_core.prompts import PromptTemplate, format_document
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from ..common.config import Config
+from ..common.usage import usage_tracker
+from .admission import AdmissionLimiter, Overloaded
+from .ann import tune_index
+from .breaker import CircuitBreaker
+from .cache import SemanticAnswerCache, normalize_text
+from .context import ContextBuilder, TokenCounter
+from .docstore import MmapDocstore, has_docstore, load_compact_vectorstore
+from .embeddings import CachedEmbeddings
+from .lexical import LexicalIndex, reciprocal_rank_fusion
+from .metrics import RequestTrace, current_trace, mark, record_scores, record_tokens, timed
+from .partitions import DEFAULT_SOURCE, SourcePartitions
+from .related import RelatedTermGraph
+from .singleflight import SingleFlight
+from .suggest import TermSuggester
+from .terms import TermIndex, is_reliable_entry, normalize_term, parse_glossary
+
+# 벡터스토어가 다시 로드되어도 유지되는 답변 캐시 (인덱스 버전이 바뀌면 비워짐)
+answer_cache = SemanticAnswerCache(
+    max_size=Config.ANSWER_CACHE_SIZE,
+    ttl=Config.ANSWER_CACHE_TTL,
+    threshold=Config.ANSWER_CACHE_THRESHOLD
+)
+
+# OpenAI(임베딩/LLM)로 가는 호출의 동시 실행 수와 대기열 길이 제한
+llm_admission = AdmissionLimiter(
+    max_concurrent=Config.CHATBOT_MAX_CONCURRENCY,
+    max_queue=Config.CHATBOT_MAX_QUEUE,
+    timeout=Config.CHATBOT_QUEUE_TIMEOUT
+)
+
+# OpenAI 장애 시 타임아웃을 기다리지 않도록 의존성별 회로 차단기 (리로드 후에도 유지)
+# 요청 제한(429)은 SDK 재시도 후에도 남은 일시적인 거절이라 장애로 세지 않음 (짧은 폭주로 회로가 열리지 않도록)
+llm_breaker = CircuitBreaker(
+    "llm", Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT, ignore=(openai.RateLimitError,)
+)
+embedding_breaker = CircuitBreaker(
+    "embedding", Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT, ignore=(openai.RateLimitError,)
+)
+
+# 같은 질문/검색어가 동시에 들어오면 검색과 LLM 호출을 한 번만 수행
+answer_flight = SingleFlight()
+search_flight = SingleFlight()
+
+def get_index_version(path):
+    """인덱스 파일들의 크기/수정시각으로 벡터스토어 버전을 식별"""
+    version = []
+    for name in sorted(os.listdir(path)):
+        stat = os.stat(os.path.join(path, name))
+        version.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(version)
 
 class EconomicChatbot:
-    def __init__(self):
+    def __init__(self, retrieval_mode=None):
         self.api_key = Config.OPENAI_API_KEY
         self.vectorstore_path = Config.VECTORSTORE_PATH
-        
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=self.api_key
+        # 로드 전에 버전을 읽어서, 로드 도중 새 인덱스가 배포되면 감시 루프가 버전 차이로 다시 리로드
+        self.index_version = get_index_version(self.vectorstore_path)
+
+        # 질문 임베딩은 메모리/디스크 캐시를 거쳐 OpenAI를 호출
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(
+                model=Config.EMBEDDING_MODEL,
+                openai_api_key=self.api_key,
+                request_timeout=Config.EMBEDDING_TIMEOUT,
+                max_retries=Config.OPENAI_MAX_RETRIES
+            ),
+            model=Config.EMBEDDING_MODEL,
+            cache_dir=Config.EMBEDDING_CACHE_DIR,
+            max_memory=Config.EMBEDDING_CACHE_SIZE,
+            breaker=embedding_breaker
         )
-        
-        self.vectorstore = FAISS.load_local(
-            self.vectorstore_path, 
-            self.embeddings, 
-            allow_dangerous_deserialization=True
+
+        load_mode = Config.VECTORSTORE_LOAD_MODE
+        if load_mode == "auto":
+            load_mode = "compact" if has_docstore(self.vectorstore_path) else "pickle"
+
+        if load_mode in ("compact", "mmap"):
+            # 문서는 압축 저장소에서 필요한 것만 읽고, mmap이면 인덱스까지 워커 간 공유
+            self.vectorstore = load_compact_vectorstore(
+                self.vectorstore_path,
+                self.embeddings,
+                use_mmap=load_mode == "mmap"
+            )
+        else:
+            print("압축 문서 저장소가 없어 index.pkl을 로드합니다 (python -m api.chatbot.docstore 로 변환 가능)")
+            self.vectorstore = FAISS.load_local(
+                self.vectorstore_path,
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+
+        # HNSW/IVF-PQ 인덱스면 검색 파라미터(efSearch/nprobe) 적용, flat은 그대로
+        tune_index(self.vectorstore.index)
+
+        self.search_k = 5
+        # dense: FAISS 검색만 사용 / hybrid: BM25 어휘 검색과 FAISS 결과를 결합
+        self.retrieval_mode = retrieval_mode or Config.RETRIEVAL_MODE
+
+        # 용어명 -> 문서 인덱스 (사전식 질문은 OpenAI 호출 없이 응답)
+        self.term_index = TermIndex(self._iter_metadata(), self._get_document)
+
+        # source별 문서 위치 (source 필터 검색은 해당 파티션만 FAISS ID 필터로 검색)
+        self.partitions = SourcePartitions(
+            ((position, metadata.get("source")) for position, metadata in self._iter_metadata()),
+            self.vectorstore.index.ntotal
         )
-        
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
-        
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=ChatOpenAI(
-                model="gpt-4o-mini",
-                temperature=0,
-                openai_api_key=self.api_key
-            ),
-            retriever=self.retriever,
-            return_source_documents=True
+
+        # 용어 자동완성 (접두사/초성 검색)
+        self.suggester = TermSuggester(self.term_index.names, self.term_index.alias_keys)
+
+        # 빌드 시 만든 관련 용어 그래프 (없으면 사전의 '관련용어'만 사용)
+        self.related_graph = RelatedTermGraph.load(self.vectorstore_path, doc_count=self.vectorstore.index.ntotal)
+
+        # hybrid가 아니면 임베딩 장애 때 처음 필요할 때 생성
+        self.lexical_index = None
+        self.lexical_lock = threading.Lock()
+        if self.retrieval_mode == "hybrid":
+            self.lexical_index = self._build_lexical_index()
+
+        # 답변 캐시는 activate()에서 이 인덱스 버전으로 전환 (리로드 검증 전에는 건드리지 않음)
+        self.answer_cache = answer_cache
+
+        self.llm = ChatOpenAI(
+            model=Config.CHAT_MODEL,
+            temperature=0,
+            openai_api_key=self.api_key,
+            timeout=Config.LLM_TIMEOUT,
+            max_retries=Config.OPENAI_MAX_RETRIES,
+            # 스트리밍 응답에도 토큰 사용량을 포함
+            stream_usage=True
+        )
+
+        # RetrievalQA(stuff 체인)와 동일한 프롬프트 구성
+        self.prompt = PROMPT_SELECTOR.get_prompt(self.llm)
+        self.document_prompt = PromptTemplate.from_template("{page_content}")
+
+        # 검색 문서를 토큰 예산 안으로 줄이고 겹치는 문서는 제외
+        self.context_builder = ContextBuilder(
+            TokenCounter(Config.CHAT_MODEL),
+            budget=Config.CONTEXT_TOKEN_BUDGET,
+            overlap_threshold=Config.CONTEXT_OVERLAP_THRESHOLD
         )
-    
-    def get_answer(self, question):
+
+    def _get_document(self, position):
+        doc_id = self.vectorstore.index_to_docstore_id.get(position)
+        doc = self.vectorstore.docstore.search(doc_id) if doc_id is not None else None
+        return doc if isinstance(doc, Document) else None
+
+    def _iter_metadata(self, with_content=False):
+        # 압축 저장소는 Document를 만들지 않고 필요한 컬럼만 읽는다
+        docstore = self.vectorstore.docstore
+        for position in range(len(self.vectorstore.index_to_docstore_id)):
+            if isinstance(docstore, MmapDocstore):
+                metadata = {}
+                for name in ("term", "source"):
+                    value = docstore.column(name, position)
+                    if value is not None:
+                        metadata[name] = value
+                if with_content:
+                    metadata["page_content"] = docstore.contents[position]
+                yield position, metadata
+                continue
+            doc = self._get_document(position)
+            if doc:
+                metadata = dict(doc.metadata)
+                if with_content:
+                    metadata["page_content"] = doc.page_content
+                yield position, metadata
+
+    def _build_lexical_index(self):
+        size = len(self.vectorstore.index_to_docstore_id)
+        texts, titles = [""] * size, [""] * size
+        for position, metadata in self._iter_metadata(with_content=True):
+            texts[position] = metadata["page_content"]
+            titles[position] = metadata.get('term', '')
+        return LexicalIndex(texts, titles=titles)
+
+    def _lexical_search(self, question, fallback=False, source=None):
+        # fallback: 임베딩을 쓸 수 없을 때 dense 모드에서도 어휘 검색 사용
+        if self.lexical_index is None and fallback:
+            with self.lexical_lock:
+                if self.lexical_index is None:
+                    self.lexical_index = self._build_lexical_index()
+        if self.lexical_index is None or (self.retrieval_mode != "hybrid" and not fallback):
+            return []
+
+        hits = []
+        with timed("lexical"):
+            mask = self.partitions.mask(source) if source else None
+            for position, score in self.lexical_index.search(question, self.search_k * 2, mask):
+                doc = self._get_document(position)
+                if doc:
+                    hits.append((doc, score))
+        return hits
+
+    def _is_confident(self, question, hits):
+        """어휘 검색 1위 문서의 용어가 질문에 그대로 있고, 질문에 함께 등장한
+        다른 용어보다 점수가 충분히 높으면 임베딩 없이 어휘 검색 결과만 사용"""
+        if not hits:
+            return False
+
+        query = normalize_term(question)
+        top_doc, top_score = hits[0]
+        top_term = normalize_term(top_doc.metadata.get('term', ''))
+        if len(top_term) < 2 or top_term not in query:
+            return False
+
+        competitor = 0.0
+        for doc, score in hits[1:]:
+            term = normalize_term(doc.metadata.get('term', ''))
+            if term != top_term and len(term) >= 2 and term in query:
+                competitor = max(competitor, score)
+        return top_score >= Config.LEXICAL_CONFIDENCE_RATIO * competitor
+
+    def _to_similarity(self, score):
+        # OpenAI 임베딩은 단위 벡터라 L2 거리 제곱 d에 대해 코사인 유사도 = 1 - d / 2
+        if self.vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            return float(score)
+        return 1.0 - float(score) / 2
+
+    def _select(self, scored):
+        """유사도 하한을 넘고 1위와 차이가 크지 않은 문서만 1~k개 선택 (없으면 빈 목록)"""
+        scored = [(doc, self._to_similarity(score)) for doc, score in scored]
+        if not scored or scored[0][1] < Config.RETRIEVAL_SCORE_FLOOR:
+            return []
+
+        cutoff = max(Config.RETRIEVAL_SCORE_FLOOR, scored[0][1] - Config.RETRIEVAL_SCORE_GAP)
+        return [(doc, score) for doc, score in scored if score >= cutoff]
+
+    @staticmethod
+    def _in_source(doc, source):
+        return source is None or doc.metadata.get("source", DEFAULT_SOURCE) == source
+
+    def _similarity_search(self, vector, k, source=None):
+        """(문서, 거리) 목록, source가 있으면 그 파티션의 문서만 FAISS에서 검색"""
+        if source is None:
+            return self.vectorstore.similarity_search_with_score_by_vector(vector, k=k)
+
+        query = np.asarray([vector], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            query /= np.linalg.norm(query, axis=1, keepdims=True)
+
+        distances, indices = self.partitions.search(self.vectorstore.index, query, k, source)
+        scored = []
+        for position, distance in zip(indices[0], distances[0]):
+            doc = self._get_document(int(position)) if position != -1 else None
+            if doc:
+                scored.append((doc, float(distance)))
+        return scored
+
+    async def _asimilarity_search(self, vector, k, source=None):
+        if source is None:
+            return await self.vectorstore.asimilarity_search_with_score_by_vector(vector, k=k)
+        return await asyncio.to_thread(self._similarity_search, vector, k, source)
+
+    def _no_match_result(self):
+        return {
+            "success": True,
+            "answer": "질문과 관련된 경제용어를 찾지 못했습니다. 궁금한 경제용어를 포함해서 다시 질문해주세요.",
+            "related_terms": [],
+            "source_count": 0,
+            "cached": False
+        }
+
+    def _fuse(self, scored, hits):
+        """dense 결과와 어휘 검색 결과를 RRF로 합침, (문서, 점수) 목록 반환 (합친 경우 점수 없음)"""
+        if not hits:
+            return scored
+
+        docs_by_key = {}
+        rankings = []
+        for docs in ([doc for doc, _ in scored], [doc for doc, _ in hits]):
+            ranking = []
+            for doc in docs:
+                docs_by_key.setdefault(doc.page_content, doc)
+                ranking.append(doc.page_content)
+            rankings.append(ranking)
+
+        return [(docs_by_key[key], None) for key in reciprocal_rank_fusion(rankings, self.search_k)]
+
+    def _build_messages(self, question, scored):
+        """(LLM 메시지, context에 들어간 문서, 토큰 리포트) 반환"""
+        with timed("context"):
+            docs = [doc for doc, _ in scored]
+            scores = [score for _, score in scored]
+            texts = [format_document(doc, self.document_prompt) for doc in docs]
+            context, used, report = self.context_builder.build(texts, None if None in scores else scores)
+            messages = self.prompt.format_messages(context=context, question=question)
+        record_tokens(context=report["context_tokens"])
+        return messages, [docs[i] for i in used], report
+
+    @staticmethod
+    def _record_usage(message):
+        # OpenAI가 돌려준 실제 토큰 사용량 (스트리밍은 사용량이 포함된 마지막 chunk에만 있음)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            record_tokens(prompt=usage.get("input_tokens"), completion=usage.get("output_tokens"))
+            usage_tracker.record_message(Config.CHAT_MODEL, message)
+
+    @staticmethod
+    def _related_terms(docs):
+        related_terms = []
+        for doc in docs:
+            term = doc.metadata.get('term', '')
+            if term and term not in related_terms:
+                related_terms.append(term)
+        return related_terms[:5]
+
+    def _build_result(self, answer, docs, context=None):
+        result = {
+            "success": True,
+            "answer": answer,
+            "related_terms": self._related_terms(docs),
+            "source_count": len(docs),
+            "cached": False
+        }
+        if context is not None:
+            result["context"] = context
+        return result
+
+    def _build_error(self, e):
+        return {
+            "success": False,
+            "answer": f"답변 생성 중 오류가 발생했습니다: {str(e)}",
+            "related_terms": [],
+            "source_count": 0,
+            "cached": False
+        }
+
+    def _answer_from_term(self, question, source=None):
+        """용어 사전에 정확히 있는 용어를 묻는 질문이면 저장된 설명으로 바로 답변"""
+        match = self.term_index.match(question)
+        if not match or not self._in_source(match[0], source):
+            return None
+
+        doc, entry = match
+        if not is_reliable_entry(entry):
+            # 파싱이 어긋난 항목일 수 있어 검색 + LLM 답변으로 진행
+            return None
+        answer = f"'{entry['term']}'에 대한 경제금융용어 사전 설명입니다.\n\n{entry['explanation']}"
+        if entry['related_terms']:
+            answer += f"\n\n관련용어: {', '.join(entry['related_terms'])}"
+
+        result = self._build_result(answer, [doc])
+        related = self.get_related_terms(entry['term'], 4) or []
+        related_terms = [entry['term']] + [item['term'] for item in related if item['term'] != entry['term']]
+        result['related_terms'] = related_terms[:5]
+        return result
+
+    def get_related_terms(self, term, count=10):
+        """관련 용어 목록 (임베딩/검색 호출 없음), 사전에 없는 용어면 None"""
+        if self.related_graph is not None:
+            return self.related_graph.related(term, count)
+
+        match = self.term_index.get(term)
+        if not match:
+            return None
+        return [{"term": name, "relation": "glossary"} for name in match[1]['related_terms'][:count]]
+
+    def _find_exact_terms(self, search_term, count, source=None):
+        """정확히 일치한 용어 + 사전의 관련용어 + 관련 용어 그래프 이웃 (count개보다 적을 수 있음)"""
+        match = self.term_index.match(search_term)
+        if not match or not self._in_source(match[0], source):
+            return None
+
+        doc, entry = match
+        names = list(entry['related_terms'])
+        names += [item['term'] for item in self.get_related_terms(entry['term'], count) or []]
+
+        docs = [doc]
+        for name in names:
+            if len(docs) >= count:
+                break
+            related = self.term_index.get(name)
+            if related and self._in_source(related[0], source):
+                docs = self._merge_terms(docs, [related[0]], count)
+        return docs
+
+    @staticmethod
+    def _merge_terms(docs, extra, count):
+        # 이미 있는 용어는 건너뛰고 count개까지 추가
+        seen = {normalize_term(doc.metadata.get('term', '')) for doc in docs}
+        merged = list(docs)
+        for doc in extra:
+            if len(merged) >= count:
+                break
+            key = normalize_term(doc.metadata.get('term', ''))
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+        return merged
+
+    def _stored_vector(self, doc):
+        """정확히 일치한 용어 문서의 저장된 벡터 (임베딩 호출 없이 비슷한 용어 검색에 사용), 없으면 None"""
+        position = self.term_index.position(doc.metadata.get('term', ''))
+        if position is None:
+            return None
+        try:
+            return self.vectorstore.index.reconstruct(position).tolist()
+        except RuntimeError:
+            return None  # 벡터를 꺼낼 수 없는 인덱스
+
+    def activate(self):
+        """서비스 인스턴스로 전환, 이전 인덱스 기준 캐시 답변은 버린다"""
+        self.answer_cache.ensure_version(self.index_version)
+
+    def validate(self):
+        """리로드 전 새 인덱스 점검 (OpenAI 호출 없이 저장된 벡터로 검색)"""
+        index = self.vectorstore.index
+        if index.ntotal == 0:
+            raise ValueError("인덱스에 문서가 없습니다")
+        if len(self.vectorstore.index_to_docstore_id) != index.ntotal:
+            raise ValueError("인덱스와 문서 매핑의 문서 수가 다릅니다")
+        if len(self.term_index) == 0:
+            raise ValueError("용어 사전이 비어 있습니다")
+
+        vector = np.asarray([index.reconstruct(0)], dtype=np.float32)
+        _, ids = index.search(vector, 1)
+        if ids[0][0] == -1 or self._get_document(int(ids[0][0])) is None:
+            raise ValueError("저장된 벡터로 문서를 검색하지 못했습니다")
+
+    def _remember(self, question, vector, result, source=None):
+        # 리로드 후 이전 인스턴스가 끝낸 답변은 새 캐시에 넣지 않음
+        # source 필터 답변은 같은 질문의 전체 검색 답변과 다를 수 있어 캐시하지 않음
+        if result['success'] and source is None and self.answer_cache.version == self.index_version:
+            self.answer_cache.put(question, vector, result)
+        return result
+
+    def _local_answer(self, question, source=None):
+        """OpenAI 호출 없이 답할 수 있는 경우 (용어 사전, 같은 질문의 캐시 답변)"""
+        with timed("local"):
+            result = self._answer_from_term(question, source)
+            if result or source is not None:
+                return result
+            return self.answer_cache.lookup(question)
+
+    async def _aembedding_unavailable(self, question, hits, source=None):
+        """임베딩을 쓸 수 없으면 어휘 검색 결과로 대신 진행"""
+        if not hits:
+            # dense 모드는 첫 대체 시 BM25 색인을 만들므로 이벤트 루프를 막지 않도록 스레드에서 실행
+            hits = await asyncio.to_thread(self._lexical_search, question, True, source)
+        if not hits:
+            return self._no_match_result(), None, None
+        return None, None, hits[:self.search_k]
+
+    async def _aprepare(self, question, source=None):
+        """LLM 호출 전 단계: 검색 후 (결과, 질문 벡터, (검색 문서, 점수) 목록) 반환, _local_answer 이후 호출"""
+        hits = self._lexical_search(question, source=source)
+        if self._is_confident(question, hits):
+            return None, None, hits[:self.search_k]
+
+        # 질문 임베딩은 한 번만 계산해서 캐시 조회와 검색에 같이 사용
         try:
-            response = self.qa_chain.invoke({"query": question})
-            
-            related_terms = []
-            if response.get('source_documents'):
-                for doc in response['source_documents']:
-                    term = doc.metadata.get('term', '')
-                    if term and term not in related_terms:
-                        related_terms.append(term)
-            
-            return {
-                "success": True,
-                "answer": response['result'],
-                "related_terms": related_terms[:5],
-                "source_count": len(response.get('source_documents', []))
-            }
-            
+            with timed("embed"):
+                vector = await self.embeddings.aembed_query(question)
         except Exception as e:
-            return {
-                "success": False,
-                "answer": f"답변 생성 중 오류가 발생했습니다: {str(e)}",
-                "related_terms": [],
-                "source_count": 0
-            }
-    
-    def find_similar_terms(self, search_term, count=5):
+            print(f"질문 임베딩 실패, 어휘 검색으로 대체: {e}")
+            return await self._aembedding_unavailable(question, hits, source)
+
+        result = self.answer_cache.lookup(question, vector) if source is None else None
+        if result:
+            return result, vector, None
+
+        with timed("search"):
+            scored = self._select(await self._asimilarity_search(vector, self.search_k, source))
+        record_scores([score for _, score in scored])
+        if not scored:
+            # 관련 문서가 없으면 LLM을 호출하지 않고 바로 안내
+            return self._no_match_result(), vector, None
+        return None, vector, self._fuse(scored, hits)
+
+    def _fallback_result(self, scored):
+        """LLM을 쓸 수 없을 때 검색 상위 문서의 '설명:'으로 바로 답변 (캐시하지 않음)"""
+        docs = [doc for doc, _ in scored]
+        parts = []
+        for doc in docs:
+            entry = parse_glossary(doc.page_content)
+            if entry and entry['explanation']:
+                parts.append(f"[{entry['term']}]\n{entry['explanation']}")
+            elif not entry:
+                content = doc.page_content.strip()
+                parts.append(content[:300] + ("..." if len(content) > 300 else ""))
+            if len(parts) >= 2:
+                break
+
+        if not parts:
+            return self._no_match_result()
+
+        answer = "지금은 AI 답변을 생성할 수 없어 경제금융용어 사전의 설명으로 안내드립니다.\n\n" + "\n\n".join(parts)
+        result = self._build_result(answer, docs)
+        result['fallback'] = True
+        return result
+
+    @staticmethod
+    def _finish_trace(trace, result, debug):
+        """단계별 기록을 메트릭에 반영, debug면 결과 사본에 timings 추가 (캐시된 결과는 그대로 둔다)"""
+        report = trace.finish(result)
+        return {**result, "timings": report} if debug else result
+
+    async def astream_answer(self, question, debug=False):
+        """LLM 토큰을 생성되는 대로 chunk 이벤트로 전달하고, 마지막에 complete 이벤트를 보낸다"""
+        trace = RequestTrace("stream")
+        # 제너레이터가 다른 태스크에서 정리될 수 있어 reset 대신 None으로 되돌린다
+        current_trace.set(trace)
+        # 중간에 닫히면 안쪽 제너레이터도 바로 닫아서 OpenAI 호출 슬롯과 LLM 연결을 반납 (GC까지 기다리지 않음)
+        events = self._astream_answer(question)
         try:
-            docs = self.vectorstore.similarity_search(search_term, k=count)
-            results = []
-            
-            for doc in docs:
-                term_name = doc.metadata.get('term', '')
-                if term_name:
-                    content = doc.page_content
-                    if len(content) > 200:
-                        content = content[:200] + "..."
-                    
-                    results.append({
-                        "term": term_name,
-                        "content": content
-                    })
-            
-            return {"success": True, "terms": results}
-            
+            async for event in events:
+                if event["type"] == "complete":
+                    report = trace.finish(event)
+                    if debug:
+                        event = {**event, "timings": report}
+                yield event
+        except Overloaded:
+            trace.finish()
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # 클라이언트가 떠나 생성을 중단한 경우
+            trace.finish(path="cancelled")
+            raise
+        finally:
+            await events.aclose()
+            current_trace.set(None)
+
+    @staticmethod
+    def _result_events(result):
+        # 이미 완성된 답변을 sources -> chunk -> complete 순서로 한 번에 전송
+        return [
+            {"type": "sources", "related_terms": result['related_terms'], "source_count": result['source_count']},
+            {"type": "chunk", "content": result['answer']},
+            {"type": "complete", **result}
+        ]
+
+    async def _astream_answer(self, question):
+        try:
+            # 용어 사전/캐시로 답할 수 있으면 한 번에 전송
+            result = self._local_answer(question)
+            if result:
+                for event in self._result_events(result):
+                    yield event
+                return
+
+            # 스트리밍이 끝날 때까지 OpenAI 호출 슬롯을 점유
+            async with llm_admission.slot():
+                result, vector, scored = await self._aprepare(question)
+                if result is None:
+                    messages, used, report = self._build_messages(question, scored)
+                    if not llm_breaker.allow():
+                        result = self._fallback_result(scored)
+                if result:
+                    for event in self._result_events(result):
+                        yield event
+                    return
+
+                parts = []
+                try:
+                    # LLM 응답을 기다리기 전에 검색 결과부터 전송
+                    yield {"type": "sources", "related_terms": self._related_terms(used), "source_count": len(used)}
+                    stream = self.llm.astream(messages)
+                    try:
+                        with timed("llm"):
+                            async for chunk in stream:
+                                self._record_usage(chunk)
+                                if chunk.content:
+                                    mark("first_token")
+                                    parts.append(chunk.content)
+                                    yield {"type": "chunk", "content": chunk.content}
+                    finally:
+                        await stream.aclose()
+                except Exception as e:
+                    llm_breaker.record_failure(e)
+                    # 이미 일부를 보냈으면 대체 답변을 이어 붙이지 않고 오류로 처리
+                    if parts:
+                        raise
+                    print(f"LLM 호출 실패, 사전 설명으로 대체: {e}")
+                    result = self._fallback_result(scored)
+                    yield {"type": "chunk", "content": result['answer']}
+                    yield {"type": "complete", **result}
+                    return
+                except BaseException:
+                    # 새 메시지/연결 종료로 취소된 경우 시험 호출 자리만 반납
+                    llm_breaker.release()
+                    raise
+                llm_breaker.record_success()
+
+            result = self._remember(question, vector, self._build_result("".join(parts), used, report))
+            yield {"type": "complete", **result}
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            result = self._build_error(e)
+            yield {"type": "chunk", "content": result['answer']}
+            yield {"type": "complete", **result}
+
+    async def aget_answer(self, question, debug=False, source=None):
+        """질문에 답변 (임베딩, 검색, LLM 호출 모두 이벤트 루프를 막지 않음)"""
+        trace = RequestTrace("answer")
+        token = current_trace.set(trace)
+        try:
+            result = await answer_flight.ado((normalize_text(question), source), self._aget_answer, question, source)
+        except Overloaded:
+            trace.finish()
+            raise
+        finally:
+            current_trace.reset(token)
+        return self._finish_trace(trace, result, debug)
+
+    async def _aget_answer(self, question, source=None):
+        try:
+            result = self._local_answer(question, source)
+            if result:
+                return result
+
+            async with llm_admission.slot():
+                result, vector, scored = await self._aprepare(question, source)
+                if result:
+                    return result
+
+                messages, used, report = self._build_messages(question, scored)
+
+                # 회로가 열려 있으면 타임아웃을 기다리지 않고 바로 사전 설명으로 답변
+                # allow() 이후에는 결과를 반드시 기록 (반쯤 열린 상태의 시험 호출 자리가 남지 않도록)
+                if not llm_breaker.allow():
+                    return self._fallback_result(scored)
+                try:
+                    with timed("llm"):
+                        response = await self.llm.ainvoke(messages)
+                except Exception as e:
+                    llm_breaker.record_failure(e)
+                    print(f"LLM 호출 실패, 사전 설명으로 대체: {e}")
+                    return self._fallback_result(scored)
+                except BaseException:
+                    llm_breaker.release()
+                    raise
+                llm_breaker.record_success()
+                self._record_usage(response)
+
+            return self._remember(question, vector, self._build_result(response.content, used, report), source)
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            return self._build_error(e)
+
+    def _format_terms(self, docs):
+        results = []
+
+        for doc in docs:
+            term_name = doc.metadata.get('term', '')
+            if term_name:
+                content = doc.page_content
+                if len(content) > 200:
+                    content = content[:200] + "..."
+
+                results.append({
+                    "term": term_name,
+                    "content": content
+                })
+
+        return results
+
+    async def afind_similar_terms(self, search_term, count=5, source=None):
+        key = (normalize_text(search_term), count, source)
+        return await search_flight.ado(key, self._afind_similar_terms, search_term, count, source)
+
+    async def _afind_similar_terms(self, search_term, count, source=None):
+        try:
+            docs = self._find_exact_terms(search_term, count, source)
+            vector = self._stored_vector(docs[0]) if docs and len(docs) < count else None
+            if vector is not None:
+                # 관련 용어만으로 k개가 안 되면 저장된 벡터로 가까운 용어를 채움
+                scored = await self._asimilarity_search(vector, count + len(docs), source)
+                docs = self._merge_terms(docs, [doc for doc, _ in scored], count)
+            elif docs is None and source is not None:
+                async with llm_admission.slot():
+                    vector = await self.embeddings.aembed_query(search_term)
+                docs = [doc for doc, _ in await self._asimilarity_search(vector, count, source)]
+            elif docs is None:
+                async with llm_admission.slot():
+                    docs = await self.vectorstore.asimilarity_search(search_term, k=count)
+            return {"success": True, "terms": self._format_terms(docs)}
+
+        except Overloaded:
+            raise
+        except Exception as e:
+            return {"success": False, "error": str(e), "terms": []}
+
+    def _unique_terms(self, terms):
+        # 정규화 결과가 같은 용어는 한 번만 검색 (요청 순서 유지)
+        unique = {}
+        for term in terms:
+            unique.setdefault(normalize_term(term), term)
+        return unique
+
+    def _search_vectors(self, vectors, count):
+        """질문 벡터 여러 개를 쌓아 FAISS 검색 1회로 처리"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+        _, indices = self.vectorstore.index.search(matrix, count)
+        results = []
+        for row in indices:
+            docs = [self._get_document(int(position)) for position in row if position != -1]
+            results.append([doc for doc in docs if doc])
+        return results
+
+    def _batch_result(self, terms, unique, found):
+        results = []
+        for term in terms:
+            docs = found.get(normalize_term(term))
+            if docs is None:
+                results.append({"term": term, "success": False, "terms": []})
+            else:
+                results.append({"term": term, "success": True, "terms": self._format_terms(docs)})
+        return {"success": True, "unique_count": len(unique), "results": results}
+
+    async def afind_similar_terms_batch(self, terms, count=5):
+        try:
+            unique = self._unique_terms(terms)
+            found, pending = {}, []
+            short = {}
+            for key, term in unique.items():
+                docs = self._find_exact_terms(term, count)
+                if docs is None:
+                    pending.append(key)
+                    continue
+                found[key] = docs
+                vector = self._stored_vector(docs[0]) if len(docs) < count else None
+                if vector is not None:
+                    short[key] = vector
+
+            if short:
+                # 관련 용어만으로 k개가 안 되는 용어는 저장된 벡터로 한 번에 검색해서 채움
+                searched = await asyncio.to_thread(self._search_vectors, list(short.values()), count * 2)
+                for key, extra in zip(short, searched):
+                    found[key] = self._merge_terms(found[key], extra, count)
+
+            if pending:
+                async with llm_admission.slot():
+                    vectors = await self.embeddings.aembed_queries([unique[key] for key in pending])
+                searched = await asyncio.to_thread(self._search_vectors, vectors, count)
+                found.update(zip(pending, searched))
+
+            return self._batch_result(terms, unique, found)
+
+        except Overloaded:
+            raise
         except Exception as e:
-            return {"success": False, "error": str(e), "terms": []}
\ No newline at end of file
+            return {"success": False, "error": str(e), "results": []}
@@ -0,0 +1,51 @@
+import faiss
+import numpy as np
+from .ann import filtered_search
+
+# source 메타데이터가 없는 이전 빌드 문서는 금융 용어 사전으로 취급 (TermIndex와 동일)
+DEFAULT_SOURCE = "financial_terms"
+
+class SourcePartitions:
+    """source 메타데이터별 FAISS 위치 목록 (source 필터 검색용)
+
+    빌드에서 문서를 source 순으로 저장하므로 파티션은 보통 연속된 위치 범위(IDSelectorRange)이고,
+    아니면 위치 목록(IDSelectorBatch)으로 해당 파티션의 문서만 검색한다.
+    """
+
+    def __init__(self, entries, size):
+        # entries: (FAISS 위치, source) 목록, size: 인덱스 문서 수
+        positions = {}
+        for position, source in entries:
+            positions.setdefault(source or DEFAULT_SOURCE, []).append(position)
+
+        self.size = size
+        self.positions = {source: np.asarray(values, dtype=np.int64) for source, values in positions.items()}
+        self.selectors = {}
+        for source, values in self.positions.items():
+            if values[-1] - values[0] + 1 == len(values):
+                self.selectors[source] = faiss.IDSelectorRange(int(values[0]), int(values[-1]) + 1)
+            else:
+                self.selectors[source] = faiss.IDSelectorBatch(values)
+        # 어휘 검색용 위치 마스크 (처음 필요할 때 생성)
+        self._masks = {}
+
+    def __contains__(self, source):
+        return source in self.positions
+
+    def names(self):
+        return sorted(self.positions)
+
+    def search(self, index, vectors, k, source):
+        """source 파티션 안에서만 검색한 (거리, 위치) 반환"""
+        return filtered_search(index, vectors, k, self.selectors[source], len(self.positions[source]))
+
+    def mask(self, source):
+        mask = self._masks.get(source)
+        if mask is None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.positions[source]] = True
+            self._masks[source] = mask
+        return mask
+
+    def stats(self):
+        return {source: len(self.positions[source]) for source in self.names()}
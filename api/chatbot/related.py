@@ -0,0 +1,155 @@
+import os
+import sys
+import numpy as np
+from .terms import TermIndex, normalize_term, parse_glossary, term_aliases
+
+RELATED_GRAPH_FILE = "related_terms.npz"
+
+# 간선 종류: 사전의 '관련용어' 링크 / 저장된 벡터 기준 최근접 용어
+GLOSSARY_LINK = 0
+SIMILAR_LINK = 1
+RELATION_NAMES = {GLOSSARY_LINK: "glossary", SIMILAR_LINK: "similar"}
+
+def _representative(documents, positions):
+    # 같은 용어가 여러 번 파싱된 경우 설명이 가장 긴 문서를 대표로 사용 (TermIndex와 동일한 기준)
+    best, best_entry = positions[0], None
+    for position in positions:
+        entry = parse_glossary(documents[position].page_content)
+        if entry and (best_entry is None or len(entry["explanation"]) > len(best_entry["explanation"])):
+            best, best_entry = position, entry
+    return best, best_entry
+
+def build_related_graph(index, documents, neighbors=5):
+    """용어 id -> 관련 용어 id 인접 리스트(CSR) 생성
+
+    documents는 FAISS 위치 순서의 문서 목록, index는 같은 순서의 벡터를 가진 FAISS 인덱스.
+    """
+    term_index = TermIndex(((i, doc.metadata) for i, doc in enumerate(documents) if doc), documents.__getitem__)
+
+    keys = list(term_index.terms)
+    term_ids = {}
+    for term_id, key in enumerate(keys):
+        for position in term_index.terms[key]:
+            term_ids[position] = term_id
+
+    names, positions, links = [], [], []
+    for key in keys:
+        position, entry = _representative(documents, term_index.terms[key])
+        positions.append(position)
+        names.append(documents[position].metadata["term"])
+
+        linked = []
+        for name in entry["related_terms"] if entry else []:
+            target = term_index.terms.get(normalize_term(name)) or term_index.aliases.get(normalize_term(name))
+            if target and term_ids[target[0]] not in linked:
+                linked.append(term_ids[target[0]])
+        links.append(linked)
+
+    # 대표 문서 벡터로 한 번에 최근접 검색 (같은 용어/사전 외 문서는 건너뛰도록 여유 있게 조회)
+    similar = [[] for _ in keys]
+    if keys and neighbors > 0:
+        vectors = np.vstack([index.reconstruct(int(position)) for position in positions])
+        _, rows = index.search(vectors, min(neighbors * 3 + 1, index.ntotal))
+        for term_id, row in enumerate(rows):
+            for position in row:
+                target = term_ids.get(int(position))
+                if target is None or target == term_id or target in links[term_id] or target in similar[term_id]:
+                    continue
+                similar[term_id].append(target)
+                if len(similar[term_id]) >= neighbors:
+                    break
+
+    offsets, targets, kinds = [0], [], []
+    for term_id in range(len(keys)):
+        for kind, edges in ((GLOSSARY_LINK, links[term_id]), (SIMILAR_LINK, similar[term_id])):
+            targets.extend(edges)
+            kinds.extend([kind] * len(edges))
+        offsets.append(len(targets))
+
+    return {
+        "terms": np.asarray(names, dtype=str),
+        "positions": np.asarray(positions, dtype=np.int32),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+        "targets": np.asarray(targets, dtype=np.int32),
+        "kinds": np.asarray(kinds, dtype=np.uint8),
+        "doc_count": np.asarray(len(documents), dtype=np.int64)
+    }
+
+def write_related_graph(path, graph):
+    # np.savez는 확장자가 없으면 .npz를 붙이므로 tmp 이름에도 확장자를 유지
+    tmp = os.path.join(path, "related_terms.tmp.npz")
+    np.savez(tmp, **graph)
+    os.replace(tmp, os.path.join(path, RELATED_GRAPH_FILE))
+
+class RelatedTermGraph:
+    """빌드 시 만든 관련 용어 그래프 (조회 시 임베딩/검색 호출 없음)"""
+
+    def __init__(self, graph):
+        self.terms = graph["terms"].tolist()
+        self.positions = graph["positions"]
+        self.offsets = graph["offsets"]
+        self.targets = graph["targets"]
+        self.kinds = graph["kinds"]
+
+        self.ids = {}
+        for term_id, name in enumerate(self.terms):
+            self.ids.setdefault(normalize_term(name), term_id)
+        for term_id, name in enumerate(self.terms):
+            for alias in term_aliases(name):
+                self.ids.setdefault(alias, term_id)
+
+    def __len__(self):
+        return len(self.terms)
+
+    @classmethod
+    def load(cls, path, doc_count=None):
+        """그래프 파일이 없거나 현재 인덱스와 문서 수가 다르면 None"""
+        file_path = os.path.join(path, RELATED_GRAPH_FILE)
+        if not os.path.exists(file_path):
+            return None
+
+        with np.load(file_path) as graph:
+            if doc_count is not None and int(graph["doc_count"]) != doc_count:
+                print(f"관련 용어 그래프가 현재 인덱스와 맞지 않아 사용하지 않습니다: {file_path}")
+                return None
+            return cls({name: graph[name] for name in graph.files})
+
+    def find(self, term):
+        return self.ids.get(normalize_term(term))
+
+    def related(self, term, k=10):
+        """[{"term", "relation"}] 목록, 사전에 없는 용어면 None"""
+        term_id = self.find(term)
+        if term_id is None:
+            return None
+
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return [
+            {"term": self.terms[target], "relation": RELATION_NAMES[int(kind)]}
+            for target, kind in zip(self.targets[start:end][:k], self.kinds[start:end][:k])
+        ]
+
+def export_related_graph(path, neighbors=5):
+    """기존 벡터스토어 폴더에서 관련 용어 그래프만 다시 생성"""
+    import faiss
+    from .docstore import MmapDocstore, has_docstore
+
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    if has_docstore(path):
+        docstore = MmapDocstore(path)
+        documents = [docstore.search(i) for i in range(len(docstore))]
+    else:
+        import pickle
+        with open(os.path.join(path, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        documents = [docstore.search(index_to_docstore_id[i]) for i in range(len(index_to_docstore_id))]
+
+    graph = build_related_graph(index, documents, neighbors)
+    write_related_graph(path, graph)
+    return len(graph["terms"]), len(graph["targets"])
+
+if __name__ == "__main__":
+    # python -m api.chatbot.related economic_terms_faiss
+    target = sys.argv[1] if len(sys.argv) > 1 else "economic_terms_faiss"
+    terms, edges = export_related_graph(target)
+    print(f"용어 {terms}개, 관련 링크 {edges}개를 {target}/{RELATED_GRAPH_FILE} 로 저장했습니다")
@@ -1,26 +1,229 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
-import json
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import anyio
 import asyncio
-from .models import EconomicChatbot
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+from ..common.config import Config
+from .admission import ClientRateLimiter, Overloaded
+from .ann import describe_index
+from .models import (
+    EconomicChatbot, answer_cache, answer_flight, search_flight, get_index_version,
+    llm_admission, llm_breaker, embedding_breaker
+)
 
 router = APIRouter()
 chatbot = None
+chatbot_lock = threading.Lock()
 
 class QuestionRequest(BaseModel):
     question: str
+    # True면 응답에 단계별 소요 시간/토큰 수/검색 점수(timings)를 포함
+    debug: bool = False
+    # financial_terms | ipo_guide, 지정하면 해당 출처 문서에서만 검색
+    source: Optional[str] = None
 
 class SearchRequest(BaseModel):
     term: str
-    k: int = 5
+    # 검색 결과 수 (FAISS 검색과 문서 로드 비용이 k에 비례하므로 상한을 둠)
+    k: int = Field(5, ge=1, le=50)
+    source: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    terms: List[str]
+    k: int = Field(5, ge=1, le=50)
 
 class ChatRequest(BaseModel):
     message: str
+    debug: bool = False
+
+# 클라이언트별 토큰 버킷 (질문/검색 요청에만 적용)
+client_limiter = ClientRateLimiter(rate=Config.CLIENT_RATE_PER_MINUTE / 60, burst=Config.CLIENT_BURST)
+
+reload_lock = threading.Lock()
+reload_status = {"reloads": 0, "last_reload": None, "last_error": None}
+# 이 워커가 /admin/reload 로 남긴 리로드 요청 (자기 요청은 다시 리로드하지 않음)
+published_marker = None
+
+# 웹소켓 답변 생성 취소 횟수 (새 메시지로 대체 / 연결 종료)
+websocket_stats = {"superseded": 0, "disconnected": 0}
 
 def get_chatbot():
     global chatbot
     if chatbot is None:
-        chatbot = EconomicChatbot()
+        # 동시에 들어온 첫 요청들이 인덱스를 중복 로드하지 않도록 잠금
+        with chatbot_lock:
+            if chatbot is None:
+                bot = EconomicChatbot()
+                bot.activate()
+                chatbot = bot
+    return chatbot
+
+class ReloadInProgress(Exception):
+    pass
+
+def reload_chatbot():
+    """새 인덱스로 챗봇을 만들고 검증한 뒤 참조만 교체
+
+    교체 전에 받은 요청은 지역 변수로 잡은 이전 인스턴스로 끝까지 처리된다.
+    """
+    global chatbot
+    if not reload_lock.acquire(blocking=False):
+        raise ReloadInProgress()
+
+    try:
+        start = time.time()
+        try:
+            bot = EconomicChatbot()
+            bot.validate()
+        except Exception as e:
+            reload_status["last_error"] = str(e)
+            raise
+
+        with chatbot_lock:
+            chatbot = bot
+        bot.activate()
+
+        elapsed = round(time.time() - start, 2)
+        reload_status["reloads"] += 1
+        reload_status["last_reload"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        reload_status["last_error"] = None
+        print(f"챗봇 인덱스 리로드 완료 ({elapsed}s, 문서 {bot.vectorstore.index.ntotal}개)")
+        return {
+            "documents": bot.vectorstore.index.ntotal,
+            "terms": len(bot.term_index),
+            "elapsed": elapsed
+        }
+    finally:
+        reload_lock.release()
+
+async def watch_vectorstore(interval):
+    """인덱스 폴더가 바뀌고 두 번 연속 같은 상태(쓰기 완료)면 리로드"""
+    pending = failed = None
+    while True:
+        await asyncio.sleep(interval)
+        if chatbot is None:
+            continue
+
+        try:
+            version = await run_in_threadpool(get_index_version, Config.VECTORSTORE_PATH)
+        except OSError:
+            continue  # 재생성 중 폴더가 잠시 없는 경우
+
+        if version == chatbot.index_version or version == failed:
+            pending = None
+            continue
+        if version != pending:
+            pending = version
+            continue
+
+        try:
+            await run_in_threadpool(reload_chatbot)
+        except ReloadInProgress:
+            continue
+        except Exception as e:
+            failed = version
+            print(f"챗봇 인덱스 리로드 실패: {e}")
+        pending = None
+
+def reload_marker_path():
+    # 모든 워커가 감시하는 리로드 요청 파일 (인덱스 폴더 밖에 두어 인덱스 버전에 영향 없음)
+    return os.path.normpath(Config.VECTORSTORE_PATH) + ".reload"
+
+def read_reload_marker():
+    try:
+        with open(reload_marker_path(), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def publish_reload():
+    """다른 워커에 리로드를 알리도록 리로드 요청 파일 갱신"""
+    global published_marker
+    marker = f"{os.getpid()} {time.time_ns()}"
+    path = reload_marker_path()
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(marker)
+    os.replace(path + ".tmp", path)
+    published_marker = marker
+
+async def watch_reload_marker(interval):
+    """다른 워커가 /admin/reload 로 리로드 요청 파일을 갱신하면 이 워커도 리로드"""
+    seen = await run_in_threadpool(read_reload_marker)
+    while True:
+        await asyncio.sleep(interval)
+        marker = await run_in_threadpool(read_reload_marker)
+        if marker is None or marker == seen:
+            continue
+        # 요청을 받은 워커는 이미 리로드했고, 아직 로드 전인 워커는 처음 로드할 때 새 인덱스를 읽음
+        if marker != published_marker and chatbot is not None:
+            try:
+                await run_in_threadpool(reload_chatbot)
+            except ReloadInProgress:
+                continue  # 진행 중인 리로드가 끝나면 다음 주기에 다시 시도
+            except Exception as e:
+                print(f"챗봇 인덱스 리로드 실패: {e}")
+        seen = marker
+
+def parse_networks(value):
+    networks = []
+    for item in value.split(","):
+        if item.strip():
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+    return networks
+
+trusted_proxies = parse_networks(Config.TRUSTED_PROXIES)
+
+def is_trusted_proxy(host):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies)
+
+def client_id(connection):
+    # 신뢰하는 프록시가 보낸 요청만 X-Forwarded-For를 따라감 (클라이언트가 임의로 넣은 헤더로 제한 회피 방지)
+    host = connection.client.host if connection.client else "unknown"
+    forwarded = connection.headers.get("x-forwarded-for")
+    if not forwarded or not is_trusted_proxy(host):
+        return host
+
+    # 오른쪽(가장 가까운 프록시)부터 신뢰하는 프록시를 건너뛴 첫 주소가 실제 클라이언트
+    for address in reversed([item.strip() for item in forwarded.split(",") if item.strip()]):
+        if not is_trusted_proxy(address):
+            return address
+    return host
+
+def check_rate_limit(connection):
+    wait = client_limiter.acquire(client_id(connection))
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="요청이 너무 많습니다. 잠시 후 다시 시도해주세요",
+            headers={"Retry-After": str(wait)}
+        )
+
+def check_source(bot, source):
+    if source is not None and source not in bot.partitions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"알 수 없는 source입니다: {source} (가능한 값: {', '.join(bot.partitions.names())})"
+        )
+
+def overloaded_error(e):
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def aget_chatbot():
+    # 벡터스토어 로딩은 블로킹 작업이므로 스레드풀에서 실행
+    if chatbot is None:
+        return await run_in_threadpool(get_chatbot)
     return chatbot
 
 @router.get("/health")
@@ -28,109 +231,345 @@ def health_check():
     return {
         "status": "running",
         "message": "경제용어 챗봇 API가 정상 동작중입니다",
-        "endpoints": ["/ask", "/search", "/chat"]
+        "endpoints": ["/ask", "/search", "/search/batch", "/related", "/suggest", "/chat", "/chat/stream"]
+    }
+
+@router.get("/stats")
+def chatbot_stats():
+    return {
+        "answer_cache": answer_cache.stats(),
+        "reload": reload_status,
+        "admission": llm_admission.stats(),
+        "breakers": {
+            "llm": llm_breaker.stats(),
+            "embedding": embedding_breaker.stats()
+        },
+        "rate_limit": client_limiter.stats(),
+        "websocket_cancelled": websocket_stats,
+        "single_flight": {
+            "answer": answer_flight.stats(),
+            "search": search_flight.stats()
+        },
+        "embedding_cache": chatbot.embeddings.stats() if chatbot else None,
+        "sources": chatbot.partitions.stats() if chatbot else None,
+        "index": describe_index(chatbot.vectorstore.index) if chatbot else None
     }
 
 @router.post("/ask")
-def ask_question(request: QuestionRequest):
+async def ask_question(request: QuestionRequest, http_request: Request):
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="빈 질문은 처리할 수 없습니다")
+    check_rate_limit(http_request)
     
     try:
-        bot = get_chatbot()
-        result = bot.get_answer(request.question)
+        bot = await aget_chatbot()
+        check_source(bot, request.source)
+        result = await bot.aget_answer(request.question, debug=request.debug, source=request.source)
         return result
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
 
 @router.post("/search")
-def search_terms(request: SearchRequest):
+async def search_terms(request: SearchRequest, http_request: Request):
     if not request.term.strip():
         raise HTTPException(status_code=400, detail="빈 검색어는 처리할 수 없습니다")
+    check_rate_limit(http_request)
     
     try:
-        bot = get_chatbot()
-        result = bot.find_similar_terms(request.term, request.k)
+        bot = await aget_chatbot()
+        check_source(bot, request.source)
+        result = await bot.afind_similar_terms(request.term, request.k, request.source)
         return result
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
 
+@router.post("/search/batch")
+async def search_terms_batch(request: BatchSearchRequest, http_request: Request):
+    terms = [term for term in request.terms if term.strip()]
+    if not terms:
+        raise HTTPException(status_code=400, detail="검색할 용어가 없습니다")
+    if len(terms) > Config.SEARCH_BATCH_MAX_TERMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"한 번에 최대 {Config.SEARCH_BATCH_MAX_TERMS}개 용어까지 검색할 수 있습니다"
+        )
+    check_rate_limit(http_request)
+
+    try:
+        bot = await aget_chatbot()
+        # 용어별 임베딩/검색 대신 임베딩 1회 + FAISS 다중 질의 1회
+        result = await bot.afind_similar_terms_batch(terms, request.k)
+        return result
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
+
+@router.get("/related")
+async def related_terms(term: str = Query(..., description="예: 국내총생산"), k: int = Query(10, ge=1, le=50)):
+    if not term.strip():
+        raise HTTPException(status_code=400, detail="빈 검색어는 처리할 수 없습니다")
+
+    bot = await aget_chatbot()
+    # 빌드 시 계산한 그래프 조회만 하므로 임베딩/검색 호출 없음
+    related = bot.get_related_terms(term, k)
+    if related is None:
+        raise HTTPException(status_code=404, detail=f"'{term}'은(는) 용어 사전에 없는 용어입니다")
+
+    return {"success": True, "term": term, "related": related}
+
+@router.get("/suggest")
+async def suggest_terms(q: str = Query("", description="입력 중인 용어 (초성 가능, 예: ㄱㄹ)"), limit: int = Query(10, ge=1, le=30)):
+    bot = await aget_chatbot()
+    # 키 입력마다 호출되므로 정렬 배열 bisect만 수행 (임베딩/검색 없음)
+    return {"query": q, "suggestions": bot.suggester.suggest(q, limit)}
+
 @router.post("/chat")
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     if not request.message.strip():
         raise HTTPException(status_code=400, detail="메시지를 입력해주세요")
+    check_rate_limit(http_request)
     
     try:
-        bot = get_chatbot()
-        result = bot.get_answer(request.message)
-        
+        bot = await aget_chatbot()
+        result = await bot.aget_answer(request.message, debug=request.debug)
+
+        metadata = {
+            "source_count": result['source_count'],
+            "user_message": request.message,
+            "context": result.get('context')
+        }
+        if request.debug:
+            metadata["timings"] = result['timings']
+
         return {
             "success": result['success'],
             "reply": result['answer'],
             "related_terms": result['related_terms'],
-            "metadata": {
-                "source_count": result['source_count'],
-                "user_message": request.message
-            }
+            "metadata": metadata
         }
+    except Overloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"서버에 문제가 발생했습니다: {str(e)}")
 
+@router.post("/admin/reload")
+async def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="관리자 토큰이 설정되지 않았습니다")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, Config.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="관리자 토큰이 올바르지 않습니다")
+
+    try:
+        # 새 인덱스 로드/검증은 스레드풀에서 진행하고, 그동안 기존 인스턴스가 요청을 처리
+        result = await run_in_threadpool(reload_chatbot)
+    except ReloadInProgress:
+        raise HTTPException(status_code=409, detail="이미 리로드가 진행 중입니다")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"리로드 실패, 기존 인덱스를 계속 사용합니다: {str(e)}")
+
+    # 요청을 받은 워커만 리로드되므로 리로드 요청 파일로 다른 워커에도 알림
+    if Config.RELOAD_MARKER_INTERVAL <= 0:
+        return {"success": True, **result, "workers": "this_worker",
+                "message": "이 워커만 리로드했습니다 (RELOAD_MARKER_INTERVAL=0)"}
+    try:
+        await run_in_threadpool(publish_reload)
+    except OSError as e:
+        return {"success": True, **result, "workers": "this_worker",
+                "message": f"이 워커만 리로드했습니다, 다른 워커에 알리지 못했습니다: {str(e)}"}
+    return {"success": True, **result, "workers": "all",
+            "message": f"다른 워커는 {Config.RELOAD_MARKER_INTERVAL:g}초 안에 리로드합니다"}
+
+async def reply_frames(user_message, debug):
+    """클라이언트로 보낼 프레임 (검색 결과 sources -> 답변 chunk... -> complete), 웹소켓과 SSE가 같이 사용"""
+    bot = await aget_chatbot()
+
+    events = bot.astream_answer(user_message, debug=debug)
+    try:
+        async for event in events:
+            if event['type'] == 'sources':
+                yield {
+                    'type': 'sources',
+                    'related_terms': event['related_terms'],
+                    'source_count': event['source_count']
+                }
+            elif event['type'] == 'chunk':
+                yield {
+                    'type': 'chunk',
+                    'content': event['content']
+                }
+            else:
+                # 완료 메시지
+                metadata = {
+                    'source_count': event['source_count'],
+                    'user_message': user_message,
+                    'context': event.get('context')
+                }
+                if debug:
+                    metadata['timings'] = event['timings']
+
+                yield {
+                    'type': 'complete',
+                    'success': event['success'],
+                    'related_terms': event['related_terms'],
+                    'metadata': metadata
+                }
+    finally:
+        # 중간에 닫혀도 (연결 끊김 등) 답변 생성 제너레이터를 바로 정리
+        await events.aclose()
+
+def sse_event(frame):
+    return f"event: {frame['type']}\ndata: {json.dumps(frame, ensure_ascii=False)}\n\n"
+
+class ClosingStreamingResponse(StreamingResponse):
+    """응답이 어떻게 끝나든 (전송 시작 전 연결 끊김 포함) 미리 받아 둔 제너레이터를 정리해서 슬롯을 반납"""
+
+    def __init__(self, content, generator, **kwargs):
+        super().__init__(content, **kwargs)
+        self.generator = generator
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # 연결 끊김으로 취소된 경우에도 정리가 끝나도록 보호
+            with anyio.CancelScope(shield=True):
+                await self.generator.aclose()
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """웹소켓을 쓸 수 없는 클라이언트용 /chat 스트리밍 버전 (Server-Sent Events)"""
+    if not request.message.strip():
+        raise HTTPException(status_code=400, detail="메시지를 입력해주세요")
+    check_rate_limit(http_request)
+
+    # 첫 프레임(검색 결과)까지 미리 받아 OpenAI 호출 슬롯을 확보, 대기열이 넘치면 스트림을 열기 전에 503 + Retry-After
+    frames = reply_frames(request.message, request.debug)
+    try:
+        first, error = await frames.__anext__(), None
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        first, error = None, e
+
+    async def events():
+        yield sse_event({'type': 'start', 'message': '답변을 생성하고 있습니다...'})
+        try:
+            if error:
+                raise error
+            yield sse_event(first)
+            async for frame in frames:
+                yield sse_event(frame)
+        except Exception as e:
+            yield sse_event({'type': 'error', 'message': f'서버에 문제가 발생했습니다: {str(e)}'})
+
+    # 프록시(nginx 등)가 응답을 모았다가 보내지 않도록 버퍼링 해제
+    return ClosingStreamingResponse(
+        events(),
+        frames,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_reply(websocket, request_id, user_message, debug):
+    """질문 하나의 답변을 생성해서 전송 (새 메시지가 오거나 연결이 끊기면 취소됨)"""
+    async def send(frame):
+        await websocket.send_text(json.dumps({**frame, 'id': request_id}))
+
+    async def send_error(frame):
+        # 소켓이 이미 닫혀 프레임 전송이 실패한 경우 오류 프레임도 보낼 수 없으므로 조용히 종료
+        try:
+            await send(frame)
+        except Exception:
+            pass
+
+    try:
+        # 응답 시작 알림
+        await send({
+            'type': 'start',
+            'message': '답변을 생성하고 있습니다...'
+        })
+
+        # LLM 토큰을 생성되는 대로 전송
+        async for frame in reply_frames(user_message, debug):
+            await send(frame)
+
+    except Overloaded as e:
+        await send_error({
+            'type': 'error',
+            'message': str(e),
+            'retry_after': e.retry_after
+        })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        await send_error({
+            'type': 'error',
+            'message': f'서버에 문제가 발생했습니다: {str(e)}'
+        })
+
+async def cancel_reply(task):
+    # 취소가 끝날 때까지 기다려서 이전 답변의 프레임이 뒤늦게 섞이지 않도록 한다
+    task.cancel()
+    await asyncio.wait([task])
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
 
+    # 연결당 생성 중인 답변은 하나, 수신은 계속해서 끊김/새 메시지를 바로 감지
+    current, current_id = None, None
+    sequence = 0
+
     try:
         while True:
             # 클라이언트로부터 메시지 수신
             data = await websocket.receive_text()
             message_data = json.loads(data)
 
+            sequence += 1
+            request_id = message_data.get('id', sequence)
+
             user_message = message_data.get('message', '').strip()
             if not user_message:
                 await websocket.send_text(json.dumps({
                     'type': 'error',
-                    'message': '메시지를 입력해주세요'
+                    'message': '메시지를 입력해주세요',
+                    'id': request_id
                 }))
                 continue
 
-            # 응답 시작 알림
-            await websocket.send_text(json.dumps({
-                'type': 'start',
-                'message': '답변을 생성하고 있습니다...'
-            }))
-
-            try:
-                bot = get_chatbot()
-                result = bot.get_answer(user_message)
-
-                # 답변을 스트리밍 형태로 전송
-                answer = result['answer']
-                chunks = [answer[i:i+50] for i in range(0, len(answer), 50)]
-
-                for chunk in chunks:
-                    await websocket.send_text(json.dumps({
-                        'type': 'chunk',
-                        'content': chunk
-                    }))
-                    await asyncio.sleep(0.1)  # 스트리밍 효과
-
-                # 완료 메시지
-                await websocket.send_text(json.dumps({
-                    'type': 'complete',
-                    'success': result['success'],
-                    'related_terms': result['related_terms'],
-                    'metadata': {
-                        'source_count': result['source_count'],
-                        'user_message': user_message
-                    }
-                }))
-
-            except Exception as e:
+            wait = client_limiter.acquire(client_id(websocket))
+            if wait:
                 await websocket.send_text(json.dumps({
                     'type': 'error',
-                    'message': f'서버에 문제가 발생했습니다: {str(e)}'
+                    'message': '요청이 너무 많습니다. 잠시 후 다시 시도해주세요',
+                    'retry_after': wait,
+                    'id': request_id
                 }))
+                continue
+
+            # 이전 답변이 아직 생성 중이면 더 이상 읽지 않으므로 취소
+            if current is not None and not current.done():
+                websocket_stats['superseded'] += 1
+                await cancel_reply(current)
+                await websocket.send_text(json.dumps({'type': 'cancelled', 'id': current_id}))
+
+            debug = bool(message_data.get('debug'))
+            current = asyncio.create_task(stream_reply(websocket, request_id, user_message, debug))
+            current_id = request_id
 
     except WebSocketDisconnect:
-        print("Client disconnected")
\ No newline at end of file
+        print("Client disconnected")
+    finally:
+        if current is not None and not current.done():
+            websocket_stats['disconnected'] += 1
+            await cancel_reply(current)
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 한 번만 실행하고 결과를 모든 대기자에게 나눠주는 도구
+
+    같은 이벤트 루프의 코루틴끼리 합쳐지며, 완료된 결과는 보관하지 않는다 (캐시는 SemanticAnswerCache 담당).
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.coalesced = 0
+
+    async def ado(self, key, fn, *args):
+        # 루프가 다른 태스크는 await할 수 없으므로 키에 루프를 포함
+        key = (id(asyncio.get_running_loop()), key)
+
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(fn(*args))
+                task.add_done_callback(lambda _: self._finish(key))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        # 대기자 하나가 취소(연결 끊김)되어도 공유 실행은 계속되도록 shield
+        return await asyncio.shield(task)
+
+    def _finish(self, key):
+        with self._lock:
+            task = self._tasks.pop(key, None)
+        # 모든 대기자가 취소된 경우 예외 미확인 경고 방지
+        if task is not None and not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+            "saved_rate": round(self.coalesced / total, 4) if total else 0.0
+        }
@@ -0,0 +1,85 @@
+from bisect import bisect_left
+from .terms import normalize_term
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+HANGUL_START, HANGUL_END = 0xAC00, 0xD7A3
+# NFKC 정규화는 호환 자모(ㄱ)를 첫가끝 초성(U+1100~)으로 바꾸므로 다시 호환 자모로 되돌린다
+CONJOINING_CHOSEONG = str.maketrans({chr(0x1100 + i): ch for i, ch in enumerate(CHOSEONG)})
+
+def to_choseong(text):
+    """완성형 한글 음절을 초성으로 변환 ('금리' -> 'ㄱㄹ'), 나머지 문자는 그대로"""
+    chars = []
+    for ch in text:
+        code = ord(ch)
+        if HANGUL_START <= code <= HANGUL_END:
+            chars.append(CHOSEONG[(code - HANGUL_START) // 588])
+        else:
+            chars.append(ch)
+    return "".join(chars)
+
+def _has_choseong(text):
+    return any(ch in CHOSEONG for ch in text)
+
+class TermSuggester:
+    """용어 자동완성용 정렬 배열 + bisect 접두사 검색
+
+    정규화된 용어/별칭과 그 초성 문자열을 각각 정렬해 두고, 접두사 범위의 앞쪽만 읽는다.
+    '금ㄹ' 처럼 음절과 초성이 섞인 입력은 초성 배열로 찾은 뒤 음절 부분을 다시 확인한다.
+    """
+
+    def __init__(self, names, aliases=None):
+        # names: 정규화 키 -> 표시용 용어명, aliases: 별칭 키 -> 정규화 키
+        self.names = list(names.values())
+        ids = {key: term_id for term_id, key in enumerate(names)}
+
+        entries = [(key, ids[key]) for key in names]
+        entries.extend((alias, ids[key]) for alias, key in (aliases or {}).items() if key in ids)
+
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [term_id for _, term_id in entries]
+
+        initials = sorted((to_choseong(key), key, term_id) for key, term_id in entries)
+        self.initial_keys = [initial for initial, _, _ in initials]
+        self.initial_entries = [(key, term_id) for _, key, term_id in initials]
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _scan(keys, prefix):
+        start = bisect_left(keys, prefix)
+        for i in range(start, len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            yield i
+
+    @staticmethod
+    def _matches(query, key):
+        # 음절은 그대로, 초성은 해당 음절의 초성과 비교
+        for q, ch in zip(query, key):
+            if q != ch and not (q in CHOSEONG and to_choseong(ch) == q):
+                return False
+        return True
+
+    def suggest(self, query, limit=10):
+        prefix = normalize_term(query).translate(CONJOINING_CHOSEONG)
+        if not prefix or limit <= 0:
+            return []
+
+        found = []
+        if _has_choseong(prefix):
+            for i in self._scan(self.initial_keys, to_choseong(prefix)):
+                key, term_id = self.initial_entries[i]
+                if term_id not in found and self._matches(prefix, key):
+                    found.append(term_id)
+                    if len(found) >= limit:
+                        break
+        else:
+            for i in self._scan(self.keys, prefix):
+                if self.ids[i] not in found:
+                    found.append(self.ids[i])
+                    if len(found) >= limit:
+                        break
+
+        return [self.names[term_id] for term_id in found]
@@ -0,0 +1,144 @@
+import re
+import unicodedata
+
+# 질문 끝에 붙는 표현 (공백 제거 후 비교)
+QUESTION_ENDINGS = (
+    "무엇인가요", "무엇인지", "무엇이야", "무엇이에요", "뭐예요", "뭐에요", "뭔가요", "뭐야", "뭐지", "뭔데",
+    "설명해주세요", "설명해줘", "알려주세요", "알려줘", "에대해서", "에대해",
+    "이란", "란", "의미", "뜻", "정의", "개념", "좀"
+)
+
+# 용어 뒤에 붙는 조사
+PARTICLES = ("은", "는", "이", "가", "을", "를", "의", "에")
+
+GLOSSARY_PATTERN = re.compile(r"^용어: (.*)\n설명: (.*)\n관련용어: (.*)$", re.DOTALL)
+
+# 사전 설명을 그대로 답변으로 쓰기 위한 최소 길이 (PDF 파싱이 어긋나 다른 항목의 문장 꼬리만 남은 경우 제외)
+MIN_EXPLANATION_LENGTH = 30
+
+def normalize_term(text):
+    """용어 비교용 정규화 (NFKC, 공백 제거, 소문자)"""
+    return "".join(unicodedata.normalize("NFKC", text).split()).lower()
+
+def parse_glossary(content):
+    """create_vectorstore.parse_word_terms가 만든 '용어/설명/관련용어' 문서를 분해"""
+    match = GLOSSARY_PATTERN.match(content)
+    if not match:
+        return None
+
+    term, explanation, related = (part.strip() for part in match.groups())
+    return {
+        "term": term,
+        "explanation": explanation,
+        "related_terms": [name.strip() for name in re.split(r"[,，]", related) if name.strip()]
+    }
+
+def term_aliases(term):
+    """'국내총생산(GDP)' -> 국내총생산, GDP / '간접금융/직접금융' -> 간접금융, 직접금융"""
+    aliases = []
+    match = re.match(r"^(.*?)\s*\(([^)]+)\)$", term)
+    if match:
+        aliases.extend(match.groups())
+    if "/" in term:
+        aliases.extend(term.split("/"))
+    return [normalize_term(alias) for alias in aliases if alias.strip()]
+
+def is_reliable_entry(entry):
+    """설명이 최소 길이 이상이고 용어(별칭 포함)나 관련용어를 언급하면 True
+
+    '금리' 항목에 '핀테크' 설명의 끝 문장이 들어간 것처럼 파싱이 어긋난 항목은 False라서
+    사전 설명으로 바로 답하지 않고 검색 + LLM으로 넘긴다.
+    """
+    explanation = normalize_term(entry["explanation"])
+    if len(entry["explanation"]) < MIN_EXPLANATION_LENGTH:
+        return False
+    names = [normalize_term(entry["term"])] + term_aliases(entry["term"])
+    names += [normalize_term(name) for name in entry["related_terms"]]
+    return any(name and name in explanation for name in names)
+
+class TermIndex:
+    """용어명 -> 문서 위치 해시 인덱스 (임베딩/LLM 호출 없이 사전식 질문에 답하기 위함)
+
+    문서 본문은 들고 있지 않고, 일치한 용어의 문서만 loader로 읽어온다.
+    """
+
+    def __init__(self, entries, loader):
+        # entries: (FAISS 위치, metadata) 목록, loader: 위치 -> Document
+        self.loader = loader
+        self.terms = {}
+        self.aliases = {}
+        self.names = {}
+        self.alias_keys = {}
+
+        for position, metadata in entries:
+            if metadata.get("source", "financial_terms") != "financial_terms":
+                continue
+            key = normalize_term(metadata.get("term", ""))
+            if key:
+                self.terms.setdefault(key, []).append(position)
+                self.names.setdefault(key, metadata["term"])
+
+        for key, name in self.names.items():
+            for alias in term_aliases(name):
+                if alias not in self.terms and alias not in self.aliases:
+                    self.aliases[alias] = self.terms[key]
+                    self.alias_keys[alias] = key
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _resolve(self, positions):
+        # 같은 용어가 여러 번 파싱된 경우 믿을 만한 설명 중 가장 긴 문서를 사용 (설명이 비어 있으면 제외)
+        best, best_rank = None, None
+        for position in positions:
+            doc = self.loader(position)
+            entry = parse_glossary(doc.page_content) if doc else None
+            if entry and entry["explanation"]:
+                rank = (is_reliable_entry(entry), len(entry["explanation"]))
+                if best is None or rank > best_rank:
+                    best, best_rank = (doc, entry), rank
+        return best
+
+    def get(self, term):
+        key = normalize_term(term)
+        positions = self.terms.get(key) or self.aliases.get(key)
+        return self._resolve(positions) if positions else None
+
+    def position(self, term):
+        """용어의 문서 위치 (여러 번 파싱된 경우 첫 위치), 사전에 없으면 None"""
+        key = normalize_term(term)
+        positions = self.terms.get(key) or self.aliases.get(key)
+        return positions[0] if positions else None
+
+    def _candidates(self, query):
+        base = normalize_term(query).rstrip("?!.~")
+        candidates = {base}
+        frontier = [base]
+
+        # '물가 뜻 좀 알려줘' 처럼 어미가 여러 개 붙은 경우까지 처리
+        for _ in range(3):
+            stripped = []
+            for text in frontier:
+                for ending in QUESTION_ENDINGS:
+                    if text.endswith(ending) and len(text) > len(ending):
+                        stripped.append(text[:-len(ending)])
+            stripped = [text for text in stripped if text not in candidates]
+            candidates.update(stripped)
+            frontier = stripped
+
+        for text in list(candidates):
+            for particle in PARTICLES:
+                if text.endswith(particle) and len(text) > len(particle) + 1:
+                    candidates.add(text[:-len(particle)])
+
+        # 원문에 가까운(긴) 후보부터 확인해서 '물가'가 '물'로 잘리는 것을 방지
+        return sorted(candidates, key=len, reverse=True)
+
+    def match(self, query):
+        """질문이 용어와 정확히 일치하거나 조사/의문 어미를 떼고 일치하면 (문서, 파싱 결과) 반환"""
+        for candidate in self._candidates(query):
+            positions = self.terms.get(candidate) or self.aliases.get(candidate)
+            value = self._resolve(positions) if positions else None
+            if value:
+                return value
+        return None
@@ -9,6 +9,85 @@ class Config:
     JUSO_API_KEY = os.getenv('JUSO_API_KEY')
     
     VECTORSTORE_PATH = "economic_terms_faiss"
+    # auto: 압축 문서 저장소(docstore.json)가 있으면 compact, 없으면 pickle
+    # compact: index.faiss 메모리 로드 + 압축 문서 저장소 / mmap: 둘 다 읽기 전용 mmap으로 워커 간 공유
+    # pickle: 기존 index.pkl 역직렬화 (allow_dangerous_deserialization 필요)
+    VECTORSTORE_LOAD_MODE = os.getenv('VECTORSTORE_LOAD_MODE', 'auto')
+    # 인덱스 폴더 변경 확인 주기(초), 0이면 감시하지 않고 /chatbot/admin/reload 로만 리로드
+    VECTORSTORE_WATCH_INTERVAL = int(os.getenv('VECTORSTORE_WATCH_INTERVAL', '0'))
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    # /chatbot/admin/reload 가 남긴 리로드 요청 파일을 다른 워커가 확인하는 주기(초), 0이면 요청받은 워커만 리로드
+    RELOAD_MARKER_INTERVAL = float(os.getenv('RELOAD_MARKER_INTERVAL', '2'))
+    # 시작 시 워밍업에 실패한 서비스 재시도 간격(초), 실패할 때마다 두 배로 늘려 최대 간격까지
+    WARMUP_RETRY_DELAY = float(os.getenv('WARMUP_RETRY_DELAY', '5'))
+    WARMUP_RETRY_MAX_DELAY = float(os.getenv('WARMUP_RETRY_MAX_DELAY', '60'))
+
+    # create_vectorstore.py가 만들 FAISS 인덱스 (flat | hnsw | ivfpq), 문서가 수만 개 이상이면 hnsw/ivfpq
+    VECTORSTORE_INDEX_TYPE = os.getenv('VECTORSTORE_INDEX_TYPE', 'flat')
+    # HNSW 노드당 이웃 수 / 빌드 탐색 폭, IVF 클러스터 수(0이면 문서 수로 자동) / PQ 서브벡터 수 / 코드 비트 수
+    HNSW_M = int(os.getenv('HNSW_M', '32'))
+    HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '200'))
+    IVF_NLIST = int(os.getenv('IVF_NLIST', '0'))
+    PQ_M = int(os.getenv('PQ_M', '96'))
+    PQ_NBITS = int(os.getenv('PQ_NBITS', '8'))
+    # IVF-PQ 후보를 k * 이 값만큼 뽑아 원본 벡터로 재정렬 (메모리는 원본 벡터만큼 추가)
+    # PQ 근사 거리만 쓰면 recall@5가 0.5 안팎이고 점수가 부정확해 RETRIEVAL_SCORE_FLOOR/GAP 컷이 어긋나므로
+    # 기본으로 켜 두고, 0(끔)은 메모리가 부족할 때만 사용
+    PQ_REFINE = int(os.getenv('PQ_REFINE', '8'))
+    # 로드 시 적용하는 검색 파라미터 (HNSW 탐색 폭 / IVF 탐색 클러스터 수, 클수록 recall↑ 속도↓)
+    HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '64'))
+    IVF_NPROBE = int(os.getenv('IVF_NPROBE', '16'))
+    # source 필터 검색에서 파티션 문서 수가 이 이하면 근사 탐색 대신 해당 위치만 전수 비교
+    PARTITION_EXACT_LIMIT = int(os.getenv('PARTITION_EXACT_LIMIT', '10000'))
+
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    CHAT_MODEL = "gpt-4o-mini"
+
+    # dense 검색 코사인 유사도 하한 (1위가 못 넘으면 LLM 없이 안내), 1위와 이 차이 이내 문서만 사용
+    RETRIEVAL_SCORE_FLOOR = float(os.getenv('RETRIEVAL_SCORE_FLOOR', '0.3'))
+    RETRIEVAL_SCORE_GAP = float(os.getenv('RETRIEVAL_SCORE_GAP', '0.15'))
+
+    # LLM에 넣는 검색 문서 context 최대 토큰 수, 이 비율 이상 겹치는 문서는 중복으로 제외
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1500'))
+    CONTEXT_OVERLAP_THRESHOLD = float(os.getenv('CONTEXT_OVERLAP_THRESHOLD', '0.8'))
+
+    # 질문 임베딩 캐시 (디렉터리를 비우면 디스크 캐시 비활성화)
+    EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', '.cache/embeddings')
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '10000'))
+
+    # 챗봇 검색 방식 (dense | hybrid), hybrid에서 어휘 검색만으로 답할 1/2위 점수 비율
+    RETRIEVAL_MODE = os.getenv('CHATBOT_RETRIEVAL_MODE', 'dense')
+    LEXICAL_CONFIDENCE_RATIO = float(os.getenv('LEXICAL_CONFIDENCE_RATIO', '1.5'))
+
+    # OpenAI 호출 타임아웃(초), 연속 실패 횟수만큼 실패하면 회로를 열고 이 시간(초) 동안 사전 설명으로 대체
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '15'))
+    EMBEDDING_TIMEOUT = float(os.getenv('EMBEDDING_TIMEOUT', '5'))
+    # 일시적인 429/5xx/연결 오류에 대한 OpenAI SDK 재시도 횟수 (시도마다 위 타임아웃 적용, 회로 차단기는 재시도 후 결과만 셈)
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '1'))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+    BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '30'))
+
+    # 이 시간(ms) 이상 걸린 챗봇 요청은 단계별 소요 시간을 로그로 남김 (0이면 끄기)
+    SLOW_REQUEST_MS = float(os.getenv('CHATBOT_SLOW_REQUEST_MS', '3000'))
+
+    # /chatbot/search/batch 한 번에 받을 수 있는 최대 용어 수
+    SEARCH_BATCH_MAX_TERMS = int(os.getenv('SEARCH_BATCH_MAX_TERMS', '100'))
+
+    # OpenAI 호출 동시 실행 수/대기열 길이/대기 시간(초), 넘치면 503 + Retry-After
+    CHATBOT_MAX_CONCURRENCY = int(os.getenv('CHATBOT_MAX_CONCURRENCY', '8'))
+    CHATBOT_MAX_QUEUE = int(os.getenv('CHATBOT_MAX_QUEUE', '32'))
+    CHATBOT_QUEUE_TIMEOUT = float(os.getenv('CHATBOT_QUEUE_TIMEOUT', '10'))
+
+    # 클라이언트(IP)별 분당 요청 수와 순간 허용량, 넘치면 429 + Retry-After (0이면 제한 없음)
+    CLIENT_RATE_PER_MINUTE = float(os.getenv('CLIENT_RATE_PER_MINUTE', '30'))
+    CLIENT_BURST = int(os.getenv('CLIENT_BURST', '10'))
+    # X-Forwarded-For를 믿을 프록시 주소/대역 (쉼표 구분, 예: 127.0.0.1,10.0.0.0/8), 비우면 접속 주소만 사용
+    TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '')
+
+    # 챗봇 의미 기반 답변 캐시
+    ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '1000'))
+    ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', '86400'))
+    ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.95'))
     
     YOUTH_POLICY_BASE_URL = "https://www.youthcenter.go.kr/go/ythip/getPlcy"
     YOUTH_RANK_BASE_URL = "https://www.youthcenter.go.kr"
@@ -0,0 +1,40 @@
+import threading
+import httpx
+import requests
+
+# 워커 전체에서 재사용하는 HTTP 클라이언트 (커넥션 풀/keep-alive 공유)
+_session = None
+_async_client = None
+_lock = threading.Lock()
+
+def get_session():
+    """동기 requests 세션"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = requests.Session()
+    return _session
+
+def get_async_client():
+    """비동기 httpx 클라이언트 (이벤트 루프 안에서만 사용)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _async_client
+
+async def open_http_clients():
+    get_session()
+    get_async_client()
+
+async def close_http_clients():
+    global _session, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,145 @@
+import contextvars
+import threading
+import time
+from collections import deque
+
+# 100만 토큰당 USD (OpenAI 공개 가격 기준), 없는 모델은 비용 0으로 집계
+MODEL_PRICES = {
+    "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    "gpt-3.5-turbo": {"prompt": 0.50, "completion": 1.50},
+    "text-embedding-3-small": {"prompt": 0.02, "completion": 0.0},
+}
+
+WINDOWS = {"1m": 60, "1h": 3600, "24h": 86400}
+
+# 현재 요청의 엔드포인트와 요청별 사용량 (UsageMiddleware가 설정)
+current_request = contextvars.ContextVar("openai_usage_request", default=None)
+
+def estimate_cost(model, prompt_tokens=0, completion_tokens=0):
+    price = MODEL_PRICES.get(model)
+    if not price:
+        return 0.0
+    return (prompt_tokens * price["prompt"] + completion_tokens * price["completion"]) / 1_000_000
+
+def _empty():
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+def _add(totals, prompt_tokens, completion_tokens, cost):
+    totals["calls"] += 1
+    totals["prompt_tokens"] += prompt_tokens
+    totals["completion_tokens"] += completion_tokens
+    totals["cost_usd"] += cost
+
+def _rounded(totals):
+    return {**totals, "cost_usd": round(totals["cost_usd"], 6)}
+
+class RequestUsage:
+    """요청 하나에서 발생한 OpenAI 호출 (캐시/용어 사전으로 호출 없이 끝났는지 확인용)"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.totals = _empty()
+
+    @property
+    def endpoint(self):
+        # 라우팅 후 매칭된 경로 템플릿, 매칭되지 않은 경로(404 등)는 하나로 묶어 임의 URL로 항목이 늘지 않게 함
+        route_path = getattr(self.scope.get("route"), "path", None)
+        if not route_path:
+            return "unmatched"
+        # FastAPI 버전에 따라 route.path에 include_router prefix가 없으므로 요청 경로의 앞부분을 붙임
+        depth = route_path.count("/")
+        prefix = "/".join(self.scope["path"].split("/")[:-depth])
+        return prefix + route_path
+
+class UsageTracker:
+    """OpenAI 토큰 사용량과 예상 비용을 엔드포인트별/모델별/최근 시간 구간별로 메모리에 집계"""
+
+    def __init__(self, bucket_seconds=60, max_buckets=1440):
+        self.bucket_seconds = bucket_seconds
+        self.started_at = time.time()
+
+        self.totals = _empty()
+        self.by_model = {}
+        self.by_endpoint = {}
+        # 엔드포인트별 요청 수 / OpenAI 호출 없이 끝난 요청 수
+        self.requests = {}
+        # (버킷 시작 시각, 합계) 최근 max_buckets개
+        self._buckets = deque(maxlen=max_buckets)
+        self._lock = threading.Lock()
+
+    def record(self, model, prompt_tokens=0, completion_tokens=0):
+        request = current_request.get()
+        endpoint = request.endpoint if request else "other"
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+
+        now = time.time()
+        bucket_start = now - now % self.bucket_seconds
+        with self._lock:
+            _add(self.totals, prompt_tokens, completion_tokens, cost)
+            _add(self.by_model.setdefault(model, _empty()), prompt_tokens, completion_tokens, cost)
+            _add(self.by_endpoint.setdefault(endpoint, _empty()), prompt_tokens, completion_tokens, cost)
+            if not self._buckets or self._buckets[-1][0] != bucket_start:
+                self._buckets.append((bucket_start, _empty()))
+            _add(self._buckets[-1][1], prompt_tokens, completion_tokens, cost)
+            if request:
+                _add(request.totals, prompt_tokens, completion_tokens, cost)
+
+    def record_message(self, model, message):
+        """LangChain 응답 메시지의 usage_metadata로 기록 (사용량이 없으면 무시)"""
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self.record(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+    def finish_request(self, request):
+        with self._lock:
+            counts = self.requests.setdefault(request.endpoint, {"requests": 0, "without_openai": 0})
+            counts["requests"] += 1
+            if request.totals["calls"] == 0:
+                counts["without_openai"] += 1
+
+    def _window(self, seconds, now):
+        totals = _empty()
+        for bucket_start, bucket in self._buckets:
+            if bucket_start > now - seconds:
+                for key in totals:
+                    totals[key] += bucket[key]
+        return totals
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            endpoints = {}
+            for endpoint in set(self.by_endpoint) | set(self.requests):
+                counts = self.requests.get(endpoint, {"requests": 0, "without_openai": 0})
+                endpoints[endpoint] = {**_rounded(self.by_endpoint.get(endpoint, _empty())), **counts}
+
+            return {
+                "since": self.started_at,
+                "total": _rounded(self.totals),
+                "by_model": {model: _rounded(totals) for model, totals in self.by_model.items()},
+                "by_endpoint": endpoints,
+                "windows": {name: _rounded(self._window(seconds, now)) for name, seconds in WINDOWS.items()}
+            }
+
+usage_tracker = UsageTracker()
+
+class UsageMiddleware:
+    """prefixes로 시작하는 요청의 경로를 기록해서 OpenAI 사용량을 엔드포인트별로 나눈다 (웹소켓은 연결 단위)"""
+
+    def __init__(self, app, prefixes=("/",)):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        # 라우터가 같은 scope에 매칭된 route를 기록하므로 엔드포인트는 사용 시점에 결정
+        request = RequestUsage(scope)
+        token = current_request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+            usage_tracker.finish_request(request)
@@ -1,11 +1,76 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from .youth_policy.routes import router as youth_policy_router
-from .chatbot.routes import router as chatbot_router
-from .portfolio.routes import router as portfolio_router
+from .chatbot.routes import router as chatbot_router, get_chatbot, watch_reload_marker, watch_vectorstore
+from .chatbot.metrics import registry as chatbot_metrics
+from .portfolio.routes import router as portfolio_router, load_portfolio_service
+from .common.config import Config
+from .common.http import open_http_clients, close_http_clients
+from .common.usage import UsageMiddleware, usage_tracker
+import asyncio
 import os
+import time
+
+# /ready 를 막는 서비스 (포트폴리오/HTTP 클라이언트는 실패해도 재시도만 하고 첫 요청에서 다시 로드)
+REQUIRED_SERVICES = ("chatbot",)
+
+async def warm_service(app, name, load):
+    """서비스 하나를 성공할 때까지 지수 백오프로 재시도하며 로드"""
+    delay = Config.WARMUP_RETRY_DELAY
+    attempt = 1
+    while True:
+        try:
+            await load()
+            break
+        except Exception as e:
+            app.state.warmup[name] = f"실패 ({attempt}회): {e}"
+            print(f"워밍업 실패 ({name}, {attempt}회), {delay:.0f}s 후 재시도: {e}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, Config.WARMUP_RETRY_MAX_DELAY)
+        attempt += 1
+
+    app.state.warmup[name] = "ok"
+    # 필수 서비스가 모두 로드되면 나머지 재시도를 기다리지 않고 바로 ready
+    app.state.ready = all(app.state.warmup.get(service) == "ok" for service in REQUIRED_SERVICES)
+
+async def warm_up(app):
+    """챗봇 인덱스, 포트폴리오 상품 데이터, HTTP 클라이언트를 병렬로 미리 로드"""
+    start = time.time()
+    tasks = {
+        "chatbot": lambda: run_in_threadpool(get_chatbot),
+        "portfolio": lambda: run_in_threadpool(load_portfolio_service),
+        "http_clients": open_http_clients
+    }
+    for name in tasks:
+        app.state.warmup[name] = "로딩 중"
+    await asyncio.gather(*(warm_service(app, name, load) for name, load in tasks.items()))
+    print(f"워밍업 완료 ({time.time() - start:.2f}s), ready={app.state.ready}")
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.ready = False
+    app.state.warmup = {}
+    # 워밍업은 백그라운드에서 진행하고 필수 서비스(챗봇)가 로드될 때까지 /ready 는 503
+    warmup_task = asyncio.create_task(warm_up(app))
+    # 워커마다 인덱스 폴더를 감시해서 create_vectorstore.py 재실행 시 재시작 없이 반영
+    watch_task = None
+    if Config.VECTORSTORE_WATCH_INTERVAL > 0:
+        watch_task = asyncio.create_task(watch_vectorstore(Config.VECTORSTORE_WATCH_INTERVAL))
+    # /chatbot/admin/reload 는 요청받은 워커에서만 실행되므로 나머지 워커는 리로드 요청 파일로 따라감
+    marker_task = None
+    if Config.RELOAD_MARKER_INTERVAL > 0:
+        marker_task = asyncio.create_task(watch_reload_marker(Config.RELOAD_MARKER_INTERVAL))
+    yield
+    warmup_task.cancel()
+    if watch_task:
+        watch_task.cancel()
+    if marker_task:
+        marker_task.cancel()
+    await close_http_clients()
 
 app = FastAPI(
     title="통합 API 서버",
@@ -13,7 +78,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -46,6 +112,9 @@ app.add_middleware(
     ],
 )
 
+# OpenAI를 호출하는 라우트만 엔드포인트별 사용량 집계
+app.add_middleware(UsageMiddleware, prefixes=("/chatbot", "/portfolio"))
+
 # 정적 파일 서빙 설정
 static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "resource", "chatbot")
 if os.path.exists(static_dir):
@@ -73,6 +142,22 @@ def root():
         "docs": "/docs"
     }
 
+@app.get("/ready")
+def ready():
+    # 로드밸런서/헬스체크용: 필수 서비스 워밍업이 끝난 워커만 200, services에 서비스별 상태
+    content = {"ready": app.state.ready, "services": app.state.warmup}
+    return JSONResponse(status_code=200 if app.state.ready else 503, content=content)
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus 수집용: 챗봇 단계별 소요 시간, 토큰 수, 검색 점수 히스토그램
+    return PlainTextResponse(chatbot_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/usage")
+def usage():
+    # OpenAI 토큰 사용량/예상 비용 (엔드포인트별, 모델별, 최근 1분/1시간/24시간)
+    return usage_tracker.stats()
+
 @app.get("/favicon.ico")
 def favicon():
     return {"message": "No favicon"}
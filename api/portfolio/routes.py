@@ -2,13 +2,25 @@ from fastapi import APIRouter, HTTPException, Depends
 from .models import PortfolioRequest, PortfolioResponse, RiskLevel
 from .services import PortfolioService
 import os
+import threading
 
 router = APIRouter()
+portfolio_service = None
+portfolio_lock = threading.Lock()
+
+def load_portfolio_service():
+    """상품 데이터를 읽어 워커당 하나의 포트폴리오 서비스를 생성"""
+    global portfolio_service
+    if portfolio_service is None:
+        with portfolio_lock:
+            if portfolio_service is None:
+                portfolio_service = PortfolioService()
+    return portfolio_service
 
 def get_portfolio_service():
     """포트폴리오 서비스 의존성 주입"""
     try:
-        return PortfolioService()
+        return load_portfolio_service()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"포트폴리오 서비스 초기화 실패: {str(e)}")
 
@@ -4,6 +4,7 @@ from pathlib import Path
 from datetime import datetime
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
+from ..common.usage import usage_tracker
 from .models import RiskLevel
 
 class PortfolioService:
@@ -89,6 +90,7 @@ class PortfolioService:
 
         try:
             response = self.llm.invoke(messages)
+            usage_tracker.record_message(self.llm.model_name, response)
             response_text = response.content.strip()
 
             # JSON 블록 찾기
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-import asyncio
 import time
 from datetime import datetime
 from .services import fetch_policies, parse_date_range, get_rank10, enrich_policies
@@ -37,10 +37,11 @@ def get_policies(address: str = Query(..., description="예: 광주광역시 남
     return JSONResponse(status_code=200, content={"policies": policies})
 
 @router.get("/top10")
-def rank10():
+async def rank10():
     start = time.time()
-    rank_list = get_rank10()
-    enriched = asyncio.run(enrich_policies(rank_list))
+    rank_list = await run_in_threadpool(get_rank10)
+    # 공유 httpx 클라이언트는 메인 이벤트 루프에서 사용
+    enriched = await enrich_policies(rank_list)
     return JSONResponse(status_code=200, content={
         "policies": enriched
     })
\ No newline at end of file
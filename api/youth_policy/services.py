@@ -1,10 +1,10 @@
 import requests
 import asyncio
-import httpx
 import time
 from datetime import datetime
 from .utils import get_zip_code
 from ..common.config import Config
+from ..common.http import get_session, get_async_client
 
 PAGE_SIZE, MAX_ROWS = 100, 200
 
@@ -25,7 +25,7 @@ def fetch_policies(ziptxt: str, max_rows=MAX_ROWS):
             "pageNum": page, "pageSize": PAGE_SIZE,
             "plcyNm": zipKwd, "zipCd": zipCd
         }
-        r = requests.get(Config.YOUTH_POLICY_BASE_URL, params=params, timeout=30)
+        r = get_session().get(Config.YOUTH_POLICY_BASE_URL, params=params, timeout=30)
         rows = r.json().get("result", {}).get("youthPolicyList", [])
         if not rows: break
         all_rows.extend([row for row in rows if row.get("zipCd", "").startswith(zipCd)])
@@ -72,9 +72,9 @@ async def get_policy_detail(client, plcyNo):
     return {}
 
 async def enrich_policies(policy_list):
-    async with httpx.AsyncClient() as client:
-        tasks = [get_policy_detail(client, item["plcyNo"]) for item in policy_list]
-        results = await asyncio.gather(*tasks)
+    client = get_async_client()
+    tasks = [get_policy_detail(client, item["plcyNo"]) for item in policy_list]
+    results = await asyncio.gather(*tasks)
     results = [r for r in results if r]
     results.sort(key=lambda x: x.get("inqCnt", 0), reverse=True)
     return results
\ No newline at end of file
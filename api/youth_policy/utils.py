@@ -1,5 +1,5 @@
-import requests
 from ..common.config import Config
+from ..common.http import get_session
 
 def get_zip_code(keyword: str):
     params = {
@@ -10,7 +10,7 @@ def get_zip_code(keyword: str):
         "resultType": "json"
     }
 
-    r = requests.get(Config.JUSO_BASE_URL, params=params, timeout=10)
+    r = get_session().get(Config.JUSO_BASE_URL, params=params, timeout=10)
     r.raise_for_status()
     data = r.json()
 
@@ -4,6 +4,9 @@ from langchain_community.vectorstores import FAISS
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 from tqdm import tqdm
+from api.chatbot.ann import convert_index, describe_index
+from api.chatbot.docstore import write_docstore
+from api.chatbot.related import build_related_graph, write_related_graph
 import os
 import re
 
@@ -249,6 +252,15 @@ def create_vectorstore(documents, api_key):
     
     return vectorstore
 
+def publish_vectorstore(build_path, save_path):
+    # 파일마다 rename으로 교체해서 mmap으로 열려 있는 이전 파일은 그대로 유지
+    # 인덱스와 문서 저장소 헤더를 마지막에 옮겨 서버가 중간 상태를 새 버전으로 읽지 않게 함
+    os.makedirs(save_path, exist_ok=True)
+    names = sorted(os.listdir(build_path), key=lambda name: name in ("index.faiss", "docstore.json"))
+    for name in names:
+        os.replace(os.path.join(build_path, name), os.path.join(save_path, name))
+    os.rmdir(build_path)
+
 def main():
     print("경제용어 벡터스토어 생성 시작")
     
@@ -271,6 +283,9 @@ def main():
     # 4. 불량 데이터 필터링
     filtered_docs = [doc for doc in documents if doc.metadata.get("term", "").strip() != "총산출량"]
     
+    # source별 문서가 연속된 FAISS 위치 범위가 되도록 정렬 (source 필터 검색이 범위 ID 필터로 처리됨)
+    filtered_docs.sort(key=lambda doc: doc.metadata.get("source", ""))
+
     print(f"최종 {len(filtered_docs)}개 용어 처리")
     
     # 5. 벡터스토어 생성
@@ -280,10 +295,33 @@ def main():
         raise ValueError("벡터스토어 생성 실패")
     
     print(f"총 {vectorstore.index.ntotal}개 벡터 생성 완료")
+
+    # 관련 용어 그래프는 정확한 거리로 만들도록 변환 전 flat 인덱스를 사용
+    flat_index = vectorstore.index
+
+    # 문서가 많으면 VECTORSTORE_INDEX_TYPE=hnsw|ivfpq 로 근사 검색 인덱스 생성 (FAISS 위치 순서는 유지)
+    vectorstore.index = convert_index(flat_index)
+    print(f"인덱스: {describe_index(vectorstore.index)}")
     
-    # 6. 로컬 저장
+    # 6. 로컬 저장 (실행 중인 서버가 반쯤 쓰인 파일을 읽지 않도록 빌드 폴더에 먼저 저장)
     save_path = "economic_terms_faiss"
-    vectorstore.save_local(save_path)
+    build_path = f"{save_path}.build"
+    vectorstore.save_local(build_path)
+
+    # 7. 서버가 index.pkl 대신 읽는 압축 문서 저장소 (본문 blob + 메타데이터 컬럼)
+    ordered_docs = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+        for i in range(vectorstore.index.ntotal)
+    ]
+    write_docstore(build_path, ordered_docs)
+
+    # 8. 관련 용어 그래프 ('관련용어' 링크 + 벡터 최근접 용어)
+    graph = build_related_graph(flat_index, ordered_docs)
+    write_related_graph(build_path, graph)
+    print(f"관련 용어 그래프: 용어 {len(graph['terms'])}개, 링크 {len(graph['targets'])}개")
+
+    # 9. 서비스 폴더로 교체 (서버는 VECTORSTORE_WATCH_INTERVAL 또는 /chatbot/admin/reload 로 반영)
+    publish_vectorstore(build_path, save_path)
     print(f"벡터스토어가 '{save_path}' 폴더에 저장됨")
     
     # 저장 확인
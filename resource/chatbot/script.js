@@ -6,6 +6,12 @@ class ChatBot {
         this.isTyping = false;
         this.websocket = null;
         this.currentBotMessage = null;
+        // 웹소켓 요청 번호, 마지막으로 보낸 질문의 프레임만 화면에 반영
+        this.requestId = 0;
+        this.activeRequestId = null;
+        this.suggestList = document.getElementById('termSuggestions');
+        this.suggestTimer = null;
+        this.suggestController = null;
 
         this.init();
         this.connectWebSocket();
@@ -22,6 +28,53 @@ class ChatBot {
     handleInputChange(e) {
         const message = e.target.value.trim();
         this.sendButton.disabled = message.length === 0;
+        this.scheduleSuggest(message);
+    }
+
+    scheduleSuggest(query) {
+        clearTimeout(this.suggestTimer);
+
+        // 용어를 입력하는 중일 때만 자동완성 (긴 문장은 제외)
+        if (!query || query.length > 20) {
+            this.renderSuggestions([]);
+            return;
+        }
+        this.suggestTimer = setTimeout(() => this.fetchSuggestions(query), 150);
+    }
+
+    async fetchSuggestions(query) {
+        // 이전 키 입력의 요청은 취소
+        if (this.suggestController) {
+            this.suggestController.abort();
+        }
+        this.suggestController = new AbortController();
+
+        try {
+            const response = await fetch(`/chatbot/suggest?q=${encodeURIComponent(query)}&limit=8`, {
+                signal: this.suggestController.signal
+            });
+            if (!response.ok) return;
+
+            const data = await response.json();
+            if (this.messageInput.value.trim() === query) {
+                this.renderSuggestions(data.suggestions || []);
+            }
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Suggest error:', error);
+            }
+        }
+    }
+
+    renderSuggestions(terms) {
+        if (!this.suggestList) return;
+
+        this.suggestList.innerHTML = '';
+        terms.forEach(term => {
+            const option = document.createElement('option');
+            option.value = term;
+            this.suggestList.appendChild(option);
+        });
     }
 
     handleKeyPress(e) {
@@ -37,15 +90,19 @@ class ChatBot {
 
         this.addMessage(message, 'user');
         this.messageInput.value = '';
+        clearTimeout(this.suggestTimer);
+        this.renderSuggestions([]);
         this.sendButton.disabled = true;
         this.messageInput.focus();
 
         if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
             this.sendWebSocketMessage(message);
         } else {
-            // Fallback to HTTP API
+            // Fallback to HTTP API (SSE 스트리밍, 지원하지 않는 환경이면 전체 응답을 한 번에)
             this.showTypingIndicator();
             try {
+                if (await this.streamFromAPI(message)) return;
+
                 const response = await this.sendToAPI(message);
                 this.hideTypingIndicator();
                 this.addMessage(response, 'bot');
@@ -57,6 +114,55 @@ class ChatBot {
         }
     }
 
+    async streamFromAPI(message) {
+        if (!window.ReadableStream || !window.TextDecoder) return false;
+
+        const response = await fetch('/chatbot/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: message })
+        });
+
+        if (response.status === 429 || response.status === 503) {
+            const retryAfter = response.headers.get('Retry-After') || 1;
+            const data = await response.json().catch(() => ({}));
+            this.hideTypingIndicator();
+            this.addMessage(`${data.detail || '요청이 많습니다.'} (${retryAfter}초 후 다시 시도해주세요)`, 'bot');
+            return true;
+        }
+        if (!response.ok || !response.body) return false;
+
+        // SSE 프레임은 웹소켓 프레임과 형식이 같으므로 같은 처리기로 전달
+        this.activeRequestId = null;
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const blocks = buffer.split('\n\n');
+            buffer = blocks.pop();
+
+            blocks.forEach(block => {
+                const data = block.split('\n')
+                    .filter(line => line.startsWith('data: '))
+                    .map(line => line.slice(6))
+                    .join('\n');
+                if (data) this.handleWebSocketMessage(JSON.parse(data));
+            });
+        }
+
+        // complete 없이 연결이 끊긴 경우에도 입력 상태를 되돌림
+        if (this.isTyping) this.hideTypingIndicator();
+        if (this.currentBotMessage) this.finalizeStreamingResponse({});
+        return true;
+    }
+
     async sendToAPI(message) {
         try {
             console.log('Sending message:', message);
@@ -73,6 +179,13 @@ class ChatBot {
             console.log('Response status:', response.status);
             console.log('Response headers:', response.headers);
 
+            // 요청 제한/서버 과부하는 오류 대신 다시 시도할 시간을 안내
+            if (response.status === 429 || response.status === 503) {
+                const retryAfter = response.headers.get('Retry-After') || 1;
+                const data = await response.json().catch(() => ({}));
+                return `${data.detail || '요청이 많습니다.'} (${retryAfter}초 후 다시 시도해주세요)`;
+            }
+
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -196,11 +309,19 @@ class ChatBot {
     }
 
     sendWebSocketMessage(message) {
+        // 이전 답변이 스트리밍 중이면 서버가 취소하므로 받은 부분까지만 남긴다
+        this.currentBotMessage = null;
+        this.requestId += 1;
+        this.activeRequestId = this.requestId;
+
         this.showTypingIndicator();
-        this.websocket.send(JSON.stringify({ message: message }));
+        this.websocket.send(JSON.stringify({ message: message, id: this.requestId }));
     }
 
     handleWebSocketMessage(data) {
+        // 취소된 이전 질문의 늦게 도착한 프레임은 무시
+        if (data.id !== undefined && data.id !== this.activeRequestId) return;
+
         switch (data.type) {
             case 'start':
                 // 응답 시작 - 타이핑 표시기는 이미 표시중
@@ -216,7 +337,10 @@ class ChatBot {
 
             case 'error':
                 this.hideTypingIndicator();
-                this.addMessage(data.message, 'bot');
+                this.addMessage(
+                    data.retry_after ? `${data.message} (${data.retry_after}초 후 다시 시도해주세요)` : data.message,
+                    'bot'
+                );
                 break;
         }
     }
@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.common.config import Config
+from api.chatbot import models
+from api.chatbot.docstore import write_docstore
+from api.chatbot.terms import normalize_term
+from benchmark_retrieval import load_documents
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_questions.json")
+# fake 백엔드 기본 설정으로 저장한 기준 결과 (갱신: --output test/benchmark_baseline.json)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# 베이스라인 대비 이만큼 나빠지면 회귀로 판단 (정확도는 절대값, 지연 시간은 비율 + 최소 차이 ms)
+QUALITY_METRICS = ("recall", "mrr")
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+class HashEmbeddings(Embeddings):
+    """문자 2/3-gram 해시 임베딩 (OpenAI 없이 항상 같은 벡터, delay초 API 지연 흉내)"""
+
+    def __init__(self, dim=256, delay=0.0):
+        self.dim = dim
+        self.delay = delay
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = "".join(text.split())
+        for n in (2, 3):
+            for i in range(len(text) - n + 1):
+                digest = hashlib.blake2b(text[i:i + n].encode("utf-8"), digest_size=4).digest()
+                vector[int.from_bytes(digest, "little") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._embed(text)
+
+    async def aembed_query(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._embed(text)
+
+class FakeChatModel(BaseChatModel):
+    """context 앞부분을 그대로 돌려주는 가짜 LLM (delay초 지연)"""
+
+    delay: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "benchmark-fake"
+
+    def _answer(self, messages):
+        return messages[-1].content[:200]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+class StageTimer:
+    """질문 하나를 처리하는 동안 단계별 소요 시간(ms)을 모은다"""
+
+    def __init__(self):
+        self.current = {}
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+        return timed
+
+    def awrap(self, stage, fn):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+        return timed
+
+    def take(self):
+        current, self.current = self.current, {}
+        return current
+
+class TimedLLM:
+    # pydantic 모델이라 ainvoke를 직접 바꿀 수 없어 감싸서 전달
+    def __init__(self, llm, timer):
+        self.llm = llm
+        self.ainvoke = timer.awrap("llm", llm.ainvoke)
+
+def summarize(latencies):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if not len(latencies):
+        return {"count": 0}
+    return {
+        "count": int(len(latencies)),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+def load_golden(path, documents):
+    with open(path, encoding="utf-8") as f:
+        golden = json.load(f)
+
+    terms = {normalize_term(doc.metadata.get("term", "")) for doc in documents if doc}
+    for item in golden:
+        missing = [term for term in item["expected"] if normalize_term(term) not in terms]
+        if missing:
+            print(f"인덱스에 없는 정답 용어: {item['question']} -> {missing}")
+    return golden
+
+def build_index(documents, path, embeddings):
+    """가짜 임베딩으로 FAISS 인덱스 + 압축 문서 저장소 생성 (서비스와 같은 로드 경로 사용)"""
+    from langchain_community.vectorstores import FAISS
+
+    vectorstore = FAISS.from_documents([doc for doc in documents if doc], embeddings)
+    vectorstore.save_local(path)
+    write_docstore(path, [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(vectorstore.index.ntotal)])
+
+def create_chatbot(args):
+    Config.VECTORSTORE_PATH = args.index_dir
+    # 임베딩 캐시가 측정에 섞이지 않도록 비활성화
+    Config.EMBEDDING_CACHE_DIR = ""
+    Config.EMBEDDING_CACHE_SIZE = 0
+
+    if args.backend == "fake":
+        embeddings = HashEmbeddings(delay=args.embed_delay / 1000)
+        if not os.path.exists(os.path.join(args.index_dir, "index.faiss")):
+            start = time.perf_counter()
+            build_index(load_documents(args.path), args.index_dir, embeddings)
+            print(f"가짜 임베딩 인덱스 생성: {(time.perf_counter() - start) * 1000:.0f}ms ({args.index_dir})")
+
+        # 서비스 코드는 그대로 두고 OpenAI 클라이언트만 결정적인 가짜로 교체
+        models.OpenAIEmbeddings = lambda **kwargs: embeddings
+        models.ChatOpenAI = lambda **kwargs: FakeChatModel(delay=args.llm_delay / 1000)
+
+    bot = models.EconomicChatbot(retrieval_mode=args.mode)
+    bot.activate()
+    return bot
+
+def rank_of(docs, expected):
+    terms = [normalize_term(doc.metadata.get("term", "")) for doc in docs]
+    for rank, term in enumerate(terms, 1):
+        if term in expected:
+            return rank
+    return 0
+
+def evaluate_retrieval(bot, golden, k):
+    """검색 방식별 recall@k(정답 용어 중 하나라도 k위 안) / MRR / 검색 지연 시간"""
+    bot.search_k = k
+    # dense 모드에서는 어휘 색인이 처음 쓰일 때 만들어지므로 측정 전에 미리 생성
+    if bot.lexical_index is None:
+        bot.lexical_index = bot._build_lexical_index()
+
+    def dense(question):
+        return bot.vectorstore.similarity_search_with_score_by_vector(bot.embeddings.embed_query(question), k=k)
+
+    def lexical(question):
+        return bot._lexical_search(question, fallback=True)[:k]
+
+    def hybrid(question):
+        hits = bot._lexical_search(question, fallback=True)
+        if bot._is_confident(question, hits):
+            return hits[:k]
+        return bot._fuse(dense(question), hits)
+
+    def adaptive(question):
+        # 실제 답변 경로와 같이 점수 하한/간격으로 1..k개만 사용
+        return bot._select(dense(question))
+
+    results = {}
+    for name, search in (("dense", dense), ("lexical", lexical), ("hybrid", hybrid), ("adaptive", adaptive)):
+        latencies, hits, reciprocal_ranks, sizes = [], [], [], []
+        for item in golden:
+            expected = {normalize_term(term) for term in item["expected"]}
+            start = time.perf_counter()
+            docs = [doc for doc, _ in search(item["question"])]
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            rank = rank_of(docs, expected)
+            hits.append(1 if rank else 0)
+            reciprocal_ranks.append(1 / rank if rank else 0)
+            sizes.append(len(docs))
+
+        results[name] = {
+            "recall": round(float(np.mean(hits)), 4),
+            "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+            "avg_docs": round(float(np.mean(sizes)), 2),
+            **summarize(latencies)
+        }
+    return results
+
+async def evaluate_pipeline(bot, golden, iterations, warm):
+    """aget_answer 전체 지연 시간과 단계별(용어 사전, 임베딩, 검색, context, LLM) 지연 시간"""
+    timer = StageTimer()
+    bot._local_answer = timer.wrap("local", bot._local_answer)
+    bot._aprepare = timer.awrap("prepare", bot._aprepare)
+    bot.embeddings.aembed_query = timer.awrap("embed", bot.embeddings.aembed_query)
+    bot.vectorstore.similarity_search_with_score_by_vector = timer.wrap(
+        "search", bot.vectorstore.similarity_search_with_score_by_vector
+    )
+    bot._build_messages = timer.wrap("context", bot._build_messages)
+    bot.llm = TimedLLM(bot.llm, timer)
+
+    totals, stages = [], {}
+    paths = {"term": 0, "cache": 0, "llm": 0, "no_match": 0}
+    context_tokens = []
+
+    for _ in range(iterations):
+        for item in golden:
+            if not warm:
+                models.answer_cache.invalidate()
+
+            timer.take()
+            start = time.perf_counter()
+            result = await bot.aget_answer(item["question"])
+            totals.append((time.perf_counter() - start) * 1000)
+
+            for stage, elapsed in timer.take().items():
+                stages.setdefault(stage, []).append(elapsed)
+
+            if result.get("cached"):
+                paths["cache"] += 1
+            elif "context" in result:
+                paths["llm"] += 1
+                context_tokens.append(result["context"]["context_tokens"])
+            elif result.get("source_count"):
+                paths["term"] += 1
+            else:
+                paths["no_match"] += 1
+
+    return {
+        "total": summarize(totals),
+        "stages": {stage: summarize(values) for stage, values in stages.items()},
+        "paths": paths,
+        "avg_context_tokens": round(float(np.mean(context_tokens)), 1) if context_tokens else 0
+    }
+
+def compare(current, baseline, quality_tolerance, latency_tolerance, latency_floor):
+    """베이스라인 대비 변화 출력, 회귀 목록 반환"""
+    regressions = []
+    print("\n베이스라인 비교")
+
+    for mode, metrics in current["retrieval"].items():
+        before = baseline.get("retrieval", {}).get(mode)
+        if not before:
+            continue
+        for metric in QUALITY_METRICS + LATENCY_METRICS:
+            if metric not in before or metric not in metrics:
+                continue
+            old, new = before[metric], metrics[metric]
+            if metric in QUALITY_METRICS:
+                regressed = new < old - quality_tolerance
+            else:
+                regressed = new > old * (1 + latency_tolerance) and new - old > latency_floor
+            print(f"  retrieval.{mode}.{metric}: {old} -> {new}{'  <- 회귀' if regressed else ''}")
+            if regressed:
+                regressions.append(f"retrieval.{mode}.{metric}")
+
+    current_stages = {"total": current["pipeline"]["total"], **current["pipeline"]["stages"]}
+    baseline_stages = baseline.get("pipeline", {})
+    baseline_stages = {"total": baseline_stages.get("total", {}), **baseline_stages.get("stages", {})}
+    for stage, metrics in current_stages.items():
+        before = baseline_stages.get(stage, {})
+        for metric in LATENCY_METRICS:
+            if metric not in before or metric not in metrics:
+                continue
+            old, new = before[metric], metrics[metric]
+            regressed = new > old * (1 + latency_tolerance) and new - old > latency_floor
+            print(f"  pipeline.{stage}.{metric}: {old} -> {new}{'  <- 회귀' if regressed else ''}")
+            if regressed:
+                regressions.append(f"pipeline.{stage}.{metric}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="챗봇 검색 정확도(recall@k, MRR)와 단계별 지연 시간 벤치마크")
+    parser.add_argument("--path", default="economic_terms_faiss", help="문서를 읽을 벡터스토어 폴더")
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--backend", choices=("fake", "openai"), default="fake",
+                        help="fake: 결정적인 해시 임베딩/가짜 LLM, openai: 실제 API와 --path 인덱스 사용")
+    parser.add_argument("--index-dir", default=None, help="fake 인덱스 저장 위치 (기본: 임시 폴더)")
+    parser.add_argument("--mode", choices=("dense", "hybrid"), default=None, help="답변 경로의 검색 방식")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="답변 캐시를 비우지 않고 측정")
+    parser.add_argument("--embed-delay", type=float, default=0.0, help="fake 임베딩 호출 지연(ms)")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="fake LLM 호출 지연(ms)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON (기본: fake 백엔드면 test/benchmark_baseline.json)")
+    parser.add_argument("--quality-tolerance", type=float, default=0.02)
+    parser.add_argument("--latency-tolerance", type=float, default=0.2)
+    parser.add_argument("--latency-floor", type=float, default=1.0, help="이보다 작은 지연 시간 증가(ms)는 무시")
+    args = parser.parse_args()
+
+    if args.backend == "openai":
+        args.index_dir = args.path
+    elif args.index_dir is None:
+        args.index_dir = tempfile.mkdtemp(prefix="chatbot_benchmark_")
+
+    bot = create_chatbot(args)
+    golden = load_golden(args.golden, load_documents(args.index_dir))
+    print(f"문서 {bot.vectorstore.index.ntotal}개, 질문 {len(golden)}개, backend={args.backend}, mode={bot.retrieval_mode}")
+
+    report = {
+        "config": {
+            "backend": args.backend,
+            "mode": bot.retrieval_mode,
+            "k": args.k,
+            "iterations": args.iterations,
+            "warm": args.warm,
+            "golden": os.path.basename(args.golden),
+            "questions": len(golden),
+            "score_floor": Config.RETRIEVAL_SCORE_FLOOR,
+            "score_gap": Config.RETRIEVAL_SCORE_GAP,
+            "context_budget": Config.CONTEXT_TOKEN_BUDGET
+        },
+        "retrieval": evaluate_retrieval(bot, golden, args.k),
+        "pipeline": asyncio.run(evaluate_pipeline(bot, golden, args.iterations, args.warm))
+    }
+
+    print(f"\n검색 (k={args.k})")
+    for mode, metrics in report["retrieval"].items():
+        print(f"  {mode:9s}" + "  ".join(f"{key}={value}" for key, value in metrics.items() if key != "count"))
+
+    print(f"\n답변 경로 {report['pipeline']['paths']}, 평균 context {report['pipeline']['avg_context_tokens']} 토큰")
+    for stage, metrics in (("total", report["pipeline"]["total"]), *report["pipeline"]["stages"].items()):
+        print(f"  {stage:9s}" + "  ".join(f"{key}={value}" for key, value in metrics.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+    if args.baseline is None and args.backend == "fake" and os.path.exists(BASELINE_PATH):
+        args.baseline = BASELINE_PATH
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        changed = [key for key in ("backend", "mode", "k", "golden", "warm")
+                   if baseline.get("config", {}).get(key) != report["config"][key]]
+        if changed:
+            print(f"\n베이스라인과 설정이 달라 비교하지 않습니다: {', '.join(changed)}")
+            return
+        regressions = compare(report, baseline, args.quality_tolerance, args.latency_tolerance, args.latency_floor)
+        if regressions:
+            print(f"\n회귀 {len(regressions)}건: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n회귀 없음")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import sys
+import time
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.chatbot.ann import build_index, index_vectors, tune_index
+from benchmark_chatbot import summarize
+
+def synthetic_vectors(size, dim, clusters, rng):
+    """정규화된 군집 벡터 (실제 문장 임베딩처럼 주제별로 모여 있는 분포 흉내)"""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 10000):
+        end = min(start + 10000, size)
+        chunk = centers[rng.integers(0, clusters, end - start)]
+        chunk += 0.6 * rng.standard_normal(chunk.shape).astype(np.float32)
+        vectors[start:end] = chunk
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def perturb(vectors, count, noise, rng):
+    """기존 벡터에 잡음을 더한 새 벡터 (질문 벡터, 실제 인덱스를 문서 수만큼 늘릴 때 사용)"""
+    rows = vectors[rng.integers(0, len(vectors), count)]
+    rows = rows + noise * rng.standard_normal(rows.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+    rows = np.ascontiguousarray(rows, dtype=np.float32)
+    faiss.normalize_L2(rows)
+    return rows
+
+def load_vectors(args, rng):
+    index_path = os.path.join(args.path, "index.faiss") if args.path else None
+    if index_path and os.path.exists(index_path):
+        vectors = index_vectors(faiss.read_index(index_path))
+        print(f"{index_path} 벡터 {len(vectors)}개 사용")
+        if args.size > len(vectors):
+            # 실제 임베딩 분포를 유지한 채 목표 문서 수까지 늘림
+            vectors = np.vstack([vectors, perturb(vectors, args.size - len(vectors), args.noise, rng)])
+        return vectors
+    return synthetic_vectors(args.size, args.dim, max(1, args.size // 50), rng)
+
+def index_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
+
+def measure(index, queries, truth, k):
+    """질문 1개씩 검색 (서버와 같은 방식)해서 recall@k와 지연 시간 측정"""
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(ids[0].tolist()) & set(expected.tolist()))
+    return {f"recall@{k}": round(hits / (len(queries) * k), 4), **summarize(latencies)}
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS 인덱스 종류별(flat / hnsw / ivfpq) recall, 지연 시간, 메모리 비교")
+    parser.add_argument("--path", default="economic_terms_faiss", help="벡터를 가져올 벡터스토어 폴더 (index.faiss 없으면 합성 벡터)")
+    parser.add_argument("--size", type=int, default=100000, help="인덱스 문서 수")
+    parser.add_argument("--dim", type=int, default=1536, help="합성 벡터 차원 (text-embedding-3-small)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.5, help="질문/확장 벡터에 더할 잡음 크기")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", default="16,32,64,128,256")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF 클러스터 수 (0이면 자동)")
+    parser.add_argument("--pq-m", type=int, default=96)
+    parser.add_argument("--nbits", type=int, default=8)
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64")
+    parser.add_argument("--refine", type=int, default=8, help="ivfpq 재정렬 배수 (0이면 재정렬 없는 ivfpq만 측정)")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP 스레드 수 (0이면 기본값)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(args.seed)
+
+    vectors = load_vectors(args, rng)
+    queries = perturb(vectors, args.queries, args.noise, rng)
+    print(f"문서 {len(vectors)}개 x {vectors.shape[1]}차원, 질문 {len(queries)}개, k={args.k}")
+
+    ivfpq = {"nlist": args.nlist, "pq_m": args.pq_m, "nbits": args.nbits}
+    ef_sweep = [{"ef_search": int(value)} for value in args.ef_search.split(",")]
+    nprobe_sweep = [{"nprobe": int(value)} for value in args.nprobe.split(",")]
+    # (인덱스 종류, 빌드 파라미터, 검색 파라미터 목록)
+    configs = [
+        ("flat", {}, [{}]),
+        ("hnsw", {"hnsw_m": args.hnsw_m, "ef_construction": args.ef_construction}, ef_sweep),
+        ("ivfpq", ivfpq, nprobe_sweep)
+    ]
+    if args.refine:
+        configs.append(("ivfpq", {**ivfpq, "refine": args.refine}, nprobe_sweep))
+
+    results, truth = [], None
+    for index_type, params, sweep in configs:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type, **params)
+        build_seconds = time.perf_counter() - start
+        memory_mb = round(index_bytes(index) / 1024 / 1024, 1)
+
+        if truth is None:
+            # 정답은 flat(전수 비교) 검색 결과
+            _, truth = index.search(queries, args.k)
+
+        for search_params in sweep:
+            tune_index(index, **search_params)
+            result = {
+                "index": index_type,
+                **params,
+                **search_params,
+                "build_s": round(build_seconds, 2),
+                "memory_mb": memory_mb,
+                **measure(index, queries, truth, args.k)
+            }
+            results.append(result)
+            print("  ".join(f"{key}={value}" for key, value in result.items() if key != "count"))
+        del index
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"size": len(vectors), "dim": int(vectors.shape[1]), "k": args.k, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import pickle
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.chatbot.docstore import MmapDocstore, has_docstore
+from api.chatbot.lexical import LexicalIndex
+from api.chatbot.terms import TermIndex, normalize_term
+
+# 용어명이 들어간 질문 / 설명 일부로 용어를 찾는 질문
+TERM_TEMPLATES = [
+    "{term}이 경제에 어떤 영향을 주나요?",
+    "요즘 뉴스에 나오는 {term} 관련해서 알려줄래?",
+]
+DESCRIPTION_TEMPLATE = "'{snippet}' 이런 걸 뭐라고 불러?"
+
+def load_documents(path):
+    # FAISS 인덱스 없이도 돌 수 있도록 docstore만 직접 로드
+    if has_docstore(path):
+        docstore = MmapDocstore(path)
+        return [docstore.search(i) for i in range(len(docstore))]
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return [docstore.search(index_to_docstore_id[i]) for i in range(len(index_to_docstore_id))]
+
+def build_queries(documents, sample, seed):
+    term_index = TermIndex(((i, doc.metadata) for i, doc in enumerate(documents) if doc), documents.__getitem__)
+    entries = [term_index.get(key) for key in sorted(term_index.terms)]
+    entries = [entry for _, entry in filter(None, entries)]
+    random.Random(seed).shuffle(entries)
+
+    queries = []
+    for entry in entries[:sample]:
+        expected = normalize_term(entry["term"])
+        for template in TERM_TEMPLATES:
+            queries.append(("term", template.format(term=entry["term"]), expected))
+        snippet = entry["explanation"][:40]
+        queries.append(("description", DESCRIPTION_TEMPLATE.format(snippet=snippet), expected))
+    return queries
+
+def evaluate(name, queries, search, k):
+    latencies, hits, reciprocal_ranks = [], [], []
+
+    for _, query, expected in queries:
+        start = time.perf_counter()
+        docs = search(query)[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        terms = [normalize_term(doc.metadata.get("term", "")) for doc in docs]
+        rank = terms.index(expected) + 1 if expected in terms else 0
+        hits.append(1 if rank else 0)
+        reciprocal_ranks.append(1 / rank if rank else 0)
+
+    latencies = np.asarray(latencies)
+    return {
+        "mode": name,
+        "queries": len(queries),
+        f"recall@{k}": round(float(np.mean(hits)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="어휘(BM25) / dense / hybrid 검색 성능 비교")
+    parser.add_argument("--path", default="economic_terms_faiss")
+    parser.add_argument("--sample", type=int, default=150, help="평가에 사용할 용어 수")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = load_documents(args.path)
+    queries = build_queries(documents, args.sample, args.seed)
+    print(f"문서 {len(documents)}개, 질문 {len(queries)}개")
+
+    start = time.perf_counter()
+    lexical_index = LexicalIndex(
+        [doc.page_content if doc else "" for doc in documents],
+        titles=[doc.metadata.get("term", "") if doc else "" for doc in documents]
+    )
+    print(f"어휘 색인 생성: {(time.perf_counter() - start) * 1000:.1f}ms, n-gram {len(lexical_index.vocab)}개")
+
+    def lexical_search(query):
+        return [documents[position] for position, _ in lexical_index.search(query, args.k)]
+
+    results = [evaluate("lexical", queries, lexical_search, args.k)]
+
+    # dense / hybrid 는 OpenAI 임베딩과 index.faiss가 필요
+    if os.getenv("OPENAI_API_KEY") and os.path.exists(os.path.join(args.path, "index.faiss")):
+        from api.common.config import Config
+        from api.chatbot.models import EconomicChatbot
+
+        # 임베딩 캐시가 측정에 섞이지 않도록 비활성화
+        Config.VECTORSTORE_PATH = args.path
+        Config.EMBEDDING_CACHE_DIR = ""
+        Config.EMBEDDING_CACHE_SIZE = 0
+        bot = EconomicChatbot(retrieval_mode="hybrid")
+
+        def dense_search(query):
+            return bot.vectorstore.similarity_search_by_vector(bot.embeddings.embed_query(query), k=args.k)
+
+        def hybrid_search(query):
+            hits = bot._lexical_search(query)
+            if bot._is_confident(query, hits):
+                return [doc for doc, _ in hits]
+            return [doc for doc, _ in bot._fuse([(doc, None) for doc in dense_search(query)], hits)]
+
+        results.append(evaluate("dense", queries, dense_search, args.k))
+        results.append(evaluate("hybrid", queries, hybrid_search, args.k))
+    else:
+        print("OPENAI_API_KEY 또는 index.faiss가 없어 dense/hybrid 측정은 건너뜁니다.")
+
+    print()
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+
+if __name__ == "__main__":
+    main()